@@ -1,27 +1,61 @@
 import os
+import json
+from functools import wraps
+from dateutil import parser as date_parser
 from flask import Flask, request, abort, jsonify
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
-from auth import AuthError, requires_auth, AUTH0_DOMAIN
+from auth import AuthError, requires_auth, jwks_store, token_cache
+from auth import authorize, check_permissions
+from auth import AUTH0_DOMAIN
 from auth import API_AUDIENCE, AUTH0_CALLBACK_URL, AUTH0_CLIENT_ID
-from config import pagination
-from models import db_drop_and_create_all, setup_db, Actor, Movie, Performance
-
-ROWS_PER_PAGE = pagination['example']
+from config import startup, bulk, profiling, metrics as metrics_config
+from models import db, init_schema, setup_db, database_path, pool_status
+from models import bulk_insert, bulk_update, bulk_delete
+from models import cast_for_movies, filmography_for_actors
+from models import Actor, Movie, Performance
+from pagination import paginate_query, invalidate_count
+from filters import filter_query, get_sort, get_fields
+from search import search_query, invalidate_search
+from cache import response_cache, conditional, not_modified
+from cache import row_etag, check_if_match
+from export import export_response
+from serializers import json_response
+from compression import init_compression
+from instrumentation import init_instrumentation
+from metrics import init_metrics, mark_error
+from profiling import init_profiling
 
 
 def create_app(test_config=None):
     app = Flask(__name__)
-    setup_db(app)
+    app.config['STARTUP_MODE'] = startup['mode']
+    app.config.update(
+        PROFILE_SAMPLE_RATE=profiling['sample_rate'],
+        PROFILE_SECRET=profiling['secret'],
+        PROFILE_DIR=profiling['dir'],
+        PROFILE_MAX_FILES=profiling['max_files'],
+        METRICS_ENABLED=metrics_config['enabled'])
+    if test_config is not None:
+        app.config.update(test_config)
+
+    setup_db(app, app.config.get('DATABASE_URL', database_path))
 
-    # Uncomment - if you want to start a new database on app refresh
-    db_drop_and_create_all()
+    # production boots do no DDL, see config.startup
+    init_schema(app.config['STARTUP_MODE'])
 
     """
     API configuratio
     """
 
+    # first, so its after_request hook runs after all the others
+    init_instrumentation(app)
+    init_metrics(app)
+    init_profiling(app)
     CORS(app)
+    init_compression(app)
 
     @app.after_request
     def after_request(response):
@@ -43,16 +77,237 @@ def create_app(test_config=None):
         except BaseException:
             return default_text
 
-    def paginate_results(request, selection):
-        # get from page or default page which is 1
-        page = request.args.get('page', 1, type=int)
+    def actor_values(body):
+        # shared by the single and bulk handlers, returns (values, error)
+        if not isinstance(body, dict):
+            return None, 'Invalid JSON'
+
+        name = body.get('name', None)
+        age = body.get('age', None)
+        gender = body.get('gender', 'Unknown')
+
+        if not age:
+            return None, 'No Age'
+
+        if not name:
+            return None, 'No Name'
 
-        # starting point and ending points
-        start = (page - 1) * ROWS_PER_PAGE
-        end = start + ROWS_PER_PAGE
+        return {'name': name, 'gender': gender, 'age': age}, None
 
-        formatted_data = [object_name.format() for object_name in selection]
-        return formatted_data[start:end]
+    def movie_values(body):
+        # shared by the single and bulk handlers, returns (values, error)
+        if not isinstance(body, dict):
+            return None, 'Invalid JSON'
+
+        title = body.get('title', None)
+        release_date = body.get('release_date', None)
+
+        if not title:
+            return None, 'No Title'
+
+        if not release_date:
+            return None, 'No release_date'
+
+        try:
+            release_date = date_parser.parse(release_date).date()
+        except (ValueError, TypeError, OverflowError):
+            return None, 'Invalid release_date'
+
+        return {'title': title, 'release_date': release_date}, None
+
+    def get_bulk_items(request):
+        # a JSON array, or one JSON object per line for NDJSON
+        if request.mimetype in ('application/x-ndjson',
+                                'application/ndjson'):
+            try:
+                items = [json.loads(line) for line in
+                         request.get_data(as_text=True).splitlines()
+                         if line.strip()]
+            except ValueError:
+                abort(400, {'message': 'Invalid NDJSON'})
+        else:
+            items = request.get_json(silent=True)
+
+        if not isinstance(items, list) or not items:
+            abort(400, {'message': 'Expected a non-empty list of items'})
+
+        if len(items) > bulk['max_items']:
+            abort(400, {
+                'message': 'Too many items, the limit is {}'.format(
+                    bulk['max_items'])})
+
+        return items
+
+    def table_changed(model):
+        # drop everything derived from the table after a successful write
+        invalidate_count(model.__tablename__)
+        invalidate_search(model.__tablename__)
+
+    def get_include(request, allowed):
+        include = set(filter(None, request.args.get('include', '').split(',')))
+        if not include <= allowed:
+            abort(400, {
+                'message': 'include must be one of: {}'.format(
+                    ', '.join(sorted(allowed)))})
+        return include
+
+    def requires_auth_to_include(name, all_of):
+        # a public endpoint that embeds `name` only for callers holding
+        # all_of; sits above conditional/cached, whose keys use the
+        # permissions this sets
+        def decorator(f):
+            @wraps(f)
+            def wrapper(*args, **kwargs):
+                if name in request.args.get('include', '').split(','):
+                    authorize(all_of=frozenset(all_of))
+                return f(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def actor_patch(body):
+        # only the fields present in body, returns (values, error)
+        if not isinstance(body, dict):
+            return None, 'Invalid JSON'
+
+        values = {key: body[key] for key in ('name', 'gender', 'age')
+                  if key in body}
+        if not values:
+            return None, 'Nothing to update'
+
+        return values, None
+
+    def movie_patch(body):
+        # only the fields present in body, returns (values, error)
+        if not isinstance(body, dict):
+            return None, 'Invalid JSON'
+
+        values = {key: body[key] for key in ('title', 'release_date')
+                  if key in body}
+        if not values:
+            return None, 'Nothing to update'
+
+        if 'release_date' in values:
+            try:
+                values['release_date'] = date_parser.parse(
+                    values['release_date']).date()
+            except (ValueError, TypeError, OverflowError):
+                return None, 'Invalid release_date'
+
+        return values, None
+
+    def get_bulk_ids(ids):
+        if not isinstance(ids, list) or not ids:
+            abort(400, {'message': 'Expected a non-empty list of ids'})
+
+        if len(ids) > bulk['max_items']:
+            abort(400, {
+                'message': 'Too many items, the limit is {}'.format(
+                    bulk['max_items'])})
+
+        try:
+            return [int(item_id) for item_id in ids]
+        except (ValueError, TypeError):
+            abort(400, {'message': 'Ids must be integers'})
+
+    def get_bulk_patches(request, validate):
+        # {"ids": [...], "values": {...}} applies one patch to many ids,
+        # {"patches": {"<id>": {...}, ...}} gives every id its own patch.
+        # Ids sharing the same patch are grouped into one UPDATE.
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict):
+            abort(400, {'message': 'Invalid JSON'})
+
+        if 'patches' in body:
+            patches = body['patches']
+            if not isinstance(patches, dict):
+                abort(400, {'message': 'patches must be an id to patch map'})
+            ids = get_bulk_ids(list(patches))
+            patches = list(patches.values())
+        else:
+            ids = get_bulk_ids(body.get('ids'))
+            patches = [body.get('values')] * len(ids)
+
+        groups = {}
+        for item_id, patch in zip(ids, patches):
+            values, error = validate(patch)
+            if error:
+                abort(422, {
+                    'message': '{} (id {})'.format(error, item_id)})
+
+            key = json.dumps(values, sort_keys=True, default=str)
+            groups.setdefault(key, (values, []))[1].append(item_id)
+
+        return ids, list(groups.values())
+
+    def bulk_patch(model, request, validate):
+        ids, groups = get_bulk_patches(request, validate)
+
+        updated = []
+        try:
+            for values, group_ids in groups:
+                updated.extend(bulk_update(model, group_ids, values))
+            db.session.commit()
+        except SQLAlchemyError:
+            db.session.rollback()
+            abort(422, {'message': 'Bulk update failed'})
+        table_changed(model)
+
+        found = set(updated)
+        return jsonify({
+            'success': True,
+            'updated': sorted(found),
+            'not_found': [item_id for item_id in ids if item_id not in found]
+        })
+
+    def bulk_remove(model, request):
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict):
+            abort(400, {'message': 'Invalid JSON'})
+        ids = get_bulk_ids(body.get('ids'))
+
+        try:
+            deleted = bulk_delete(model, ids)
+            db.session.commit()
+        except SQLAlchemyError:
+            db.session.rollback()
+            abort(422, {'message': 'Bulk delete failed'})
+        table_changed(model)
+
+        found = set(deleted)
+        return jsonify({
+            'success': True,
+            'deleted': sorted(found),
+            'not_found': [item_id for item_id in ids if item_id not in found]
+        })
+
+    def bulk_create(model, items, validate):
+        rows, errors, positions = [], [], []
+        for index, item in enumerate(items):
+            values, error = validate(item)
+            if error:
+                errors.append({'index': index, 'message': error})
+            else:
+                rows.append(values)
+                positions.append(index)
+
+        created = [None] * len(items)
+        if rows:
+            try:
+                ids = bulk_insert(model, rows, bulk['batch_size'])
+                db.session.commit()
+            except SQLAlchemyError:
+                db.session.rollback()
+                abort(422, {'message': 'Bulk insert failed'})
+
+            for index, new_id in zip(positions, ids):
+                created[index] = new_id
+            table_changed(model)
+
+        return jsonify({
+            'success': not errors,
+            'created': created,
+            'errors': errors
+        })
 
     @app.route("/auth")
     def generate_auth_url():
@@ -81,21 +336,131 @@ def create_app(test_config=None):
             'LiveWebApp': 'https://casting-wing.herokuapp.com',
         })
 
+    """
+    Health Endpoint
+    """
+
+    @app.route('/health/db', methods=['GET'])
+    def health_db():
+        try:
+            db.session.execute(text('SELECT 1'))
+        except SQLAlchemyError:
+            db.session.rollback()
+            return jsonify({
+                'success': False,
+                'database': 'unavailable',
+                'pool': pool_status()
+            }), 503
+
+        return jsonify({
+            'success': True,
+            'database': 'ok',
+            'pool': pool_status()
+        })
+
+    """
+    Endpoint /search GET
+    """
+
+    @app.route('/search', methods=['GET'])
+    @requires_auth(all_of=['read:actors', 'read:movies'])
+    @conditional('actors', 'movies')
+    @response_cache.cached('actors', 'movies')
+    def search(payload):
+        actors, actors_page = search_query(
+            request, Actor, Actor.query,
+            columns=get_fields(request, Actor, 'fields[actors]'))
+        movies, movies_page = search_query(
+            request, Movie, Movie.query,
+            columns=get_fields(request, Movie, 'fields[movies]'))
+
+        return json_response({
+            'success': True,
+            'actors': actors,
+            'total_actors': actors_page['total'],
+            'movies': movies,
+            'total_movies': movies_page['total'],
+            'page': actors_page['page'],
+            'per_page': actors_page['per_page']
+        })
+
     """
     Endpoint /actors GET/POST/DELETE/UPDATE
     """
     @app.route('/actors', methods=['GET'])
     # @requires_auth('read:actors')
+    @requires_auth_to_include('movies', ['read:actors', 'read:movies'])
+    @conditional('actors', 'movies')
+    @response_cache.cached('actors', 'movies')
     def get_actors():
-        selection = Actor.query.all()
-        paginated_actors = paginate_results(request, selection)
+        include = get_include(request, {'movies'})
+        columns = get_fields(request, Actor)
+        query, count_key = filter_query(request, Actor, Actor.query)
+        if 'q' in request.args:
+            paginated_actors, page_info = search_query(
+                request, Actor, query, bool(count_key), columns)
+        else:
+            paginated_actors, page_info = paginate_query(
+                request, query, Actor, get_sort(request, Actor), count_key,
+                columns)
 
         if len(paginated_actors) == 0:
             abort(404, {'message': 'No Actors found in Database!'})
 
-        return jsonify({
+        if 'movies' in include:
+            filmography = filmography_for_actors(
+                [actor['id'] for actor in paginated_actors])
+            for actor in paginated_actors:
+                actor['movies'] = filmography[actor['id']]
+
+        return json_response({
+            'success': True,
+            'actors': paginated_actors,
+            **page_info
+        })
+
+    @app.route('/actors/<int:actor_id>', methods=['GET'])
+    @requires_auth('read:actors')
+    def get_actor(payload, actor_id):
+        actor = Actor.query.filter(Actor.id == actor_id).one_or_none()
+
+        if not actor:
+            abort(
+                404, {
+                    'message': 'Actor with id {} not found'.format(actor_id)})
+
+        etag = row_etag(actor)
+        response = not_modified(etag, actor.updated_at)
+        if response is not None:
+            return response
+
+        response = jsonify({
             'success': True,
-            'actors': paginated_actors
+            'actor': {column.key: getattr(actor, column.key)
+                      for column in get_fields(request, Actor)}
+        })
+        response.set_etag(etag)
+        response.last_modified = actor.updated_at
+        return response
+
+    @app.route('/actors/<int:actor_id>/movies', methods=['GET'])
+    @requires_auth(all_of=['read:actors', 'read:movies'])
+    @conditional('actors', 'movies')
+    @response_cache.cached('actors', 'movies')
+    def get_actor_movies(payload, actor_id):
+        actor = Actor.query.with_entities(Actor.id) \
+            .filter(Actor.id == actor_id).one_or_none()
+
+        if not actor:
+            abort(
+                404, {
+                    'message': 'Actor with id {} not found'.format(actor_id)})
+
+        return json_response({
+            'success': True,
+            'actor': actor_id,
+            'movies': filmography_for_actors(
+                [actor_id], get_fields(request, Movie))[actor_id]
         })
 
     @app.route('/actors', methods=['POST'])
@@ -106,29 +471,35 @@ def create_app(test_config=None):
         if not body:
             abort(400, {'message': 'Invalid JSON'})
 
-        name = body.get('name', None)
-        age = body.get('age', None)
-        gender = body.get('gender', 'Unknown')
-
-        if not age:
-            abort(422, {'message': 'No Age'})
-
-        if not name:
-            abort(422, {'message': 'No Name'})
+        values, error = actor_values(body)
+        if error:
+            abort(422, {'message': error})
 
         # add new records and insert to DB
-        new_actor = (Actor(
-            name=name,
-            gender=gender,
-            age=age
-        ))
-        new_actor.insert
+        new_actor = Actor(**values)
+        new_actor.insert()
+        table_changed(Actor)
 
         return jsonify({
             'success': True,
             'created': new_actor.id
         })
 
+    @app.route('/actors/bulk', methods=['POST'])
+    @requires_auth('create:actors')
+    def insert_actors_bulk(payload):
+        return bulk_create(Actor, get_bulk_items(request), actor_values)
+
+    @app.route('/actors/bulk', methods=['PATCH'])
+    @requires_auth('edit:actors')
+    def edit_actors_bulk(payload):
+        return bulk_patch(Actor, request, actor_patch)
+
+    @app.route('/actors/bulk', methods=['DELETE'])
+    @requires_auth('delete:actors')
+    def delete_actors_bulk(payload):
+        return bulk_remove(Actor, request)
+
     @app.route('/actors/<actor_id>', methods=['PATCH'])
     @requires_auth('edit:actors')
     def edit_actors(payload, actor_id):
@@ -148,6 +519,7 @@ def create_app(test_config=None):
             abort(
                 404, {
                     'message': 'Actor with id {} not found'.format(actor_id)})
+        check_if_match(updated_actor)
 
         # extract data
         name = body.get('name', updated_actor.name)
@@ -158,13 +530,16 @@ def create_app(test_config=None):
         updated_actor.name = name
         updated_actor.age = age
         updated_actor.gender = gender
-        updated_actor.update
+        updated_actor.update()
+        table_changed(Actor)
 
-        return jsonify({
+        response = jsonify({
             'success': True,
             'updated': updated_actor.id,
             'actor': [updated_actor.format()]
         })
+        response.set_etag(row_etag(updated_actor))
+        return response
 
     @app.route('/actors/<actor_id>', methods=['DELETE'])
     @requires_auth('delete:actors')
@@ -179,9 +554,11 @@ def create_app(test_config=None):
             abort(
                 404, {
                     'message': 'Actor with id {} not found'.format(actor_id)})
+        check_if_match(deleted_actor)
 
         # delete
         deleted_actor.delete()
+        table_changed(Actor)
 
         return jsonify({
             'success': True,
@@ -194,16 +571,75 @@ def create_app(test_config=None):
 
     @app.route('/movies', methods=['GET'])
     @requires_auth('read:movies')
+    @conditional('movies', 'actors')
+    @response_cache.cached('movies', 'actors')
     def get_movies(payload):
-        selection = Movie.query.all()
-        movies_paginated = paginate_results(request, selection)
+        include = get_include(request, {'actors'})
+        if 'actors' in include:
+            check_permissions('read:actors', payload)
+
+        columns = get_fields(request, Movie)
+        query, count_key = filter_query(request, Movie, Movie.query)
+        if 'q' in request.args:
+            movies_paginated, page_info = search_query(
+                request, Movie, query, bool(count_key), columns)
+        else:
+            movies_paginated, page_info = paginate_query(
+                request, query, Movie, get_sort(request, Movie), count_key,
+                columns)
 
         if len(movies_paginated) == 0:
             abort(404, {'message': 'No movies found'})
 
-        return jsonify({
+        if 'actors' in include:
+            cast = cast_for_movies([movie['id'] for movie in movies_paginated])
+            for movie in movies_paginated:
+                movie['actors'] = cast[movie['id']]
+
+        return json_response({
             'success': True,
-            'movies': movies_paginated
+            'movies': movies_paginated,
+            **page_info
+        })
+
+    @app.route('/movies/<int:movie_id>', methods=['GET'])
+    @requires_auth('read:movies')
+    def get_movie(payload, movie_id):
+        movie = Movie.query.filter(Movie.id == movie_id).one_or_none()
+
+        if not movie:
+            abort(404, {'message': 'Movie not found'})
+
+        etag = row_etag(movie)
+        response = not_modified(etag, movie.updated_at)
+        if response is not None:
+            return response
+
+        response = jsonify({
+            'success': True,
+            'movie': {column.key: getattr(movie, column.key)
+                      for column in get_fields(request, Movie)}
+        })
+        response.set_etag(etag)
+        response.last_modified = movie.updated_at
+        return response
+
+    @app.route('/movies/<int:movie_id>/actors', methods=['GET'])
+    @requires_auth(all_of=['read:movies', 'read:actors'])
+    @conditional('movies', 'actors')
+    @response_cache.cached('movies', 'actors')
+    def get_movie_actors(payload, movie_id):
+        movie = Movie.query.with_entities(Movie.id) \
+            .filter(Movie.id == movie_id).one_or_none()
+
+        if not movie:
+            abort(404, {'message': 'Movie not found'})
+
+        return json_response({
+            'success': True,
+            'movie': movie_id,
+            'actors': cast_for_movies(
+                [movie_id], get_fields(request, Actor))[movie_id]
         })
 
     @app.route('/movies', methods=['POST'])
@@ -214,28 +650,35 @@ def create_app(test_config=None):
         if not body:
             abort(400, {'message': 'Invalid JSON'})
 
-        # get values
-        title = body.get('title', None)
-        release_date = body.get('release_date', None)
-
-        if not title:
-            abort(422, {'message': 'No Title'})
-
-        if not release_date:
-            abort(422, {'message': 'No release_date'})
+        values, error = movie_values(body)
+        if error:
+            abort(422, {'message': error})
 
         # create a new movie record
-        new_movie = (Movie(
-            title=title,
-            release_date=release_date
-        ))
-        new_movie.insert  # add to database
+        new_movie = Movie(**values)
+        new_movie.insert()  # add to database
+        table_changed(Movie)
 
         return jsonify({
             'success': True,
             'created': new_movie.id
         })
 
+    @app.route('/movies/bulk', methods=['POST'])
+    @requires_auth('create:movies')
+    def insert_movies_bulk(payload):
+        return bulk_create(Movie, get_bulk_items(request), movie_values)
+
+    @app.route('/movies/bulk', methods=['PATCH'])
+    @requires_auth('edit:movies')
+    def edit_movies_bulk(payload):
+        return bulk_patch(Movie, request, movie_patch)
+
+    @app.route('/movies/bulk', methods=['DELETE'])
+    @requires_auth('delete:movies')
+    def delete_movies_bulk(payload):
+        return bulk_remove(Movie, request)
+
     @app.route('/movies/<movie_id>', methods=['PATCH'])
     @requires_auth('edit:movies')
     def edit_movies(payload, movie_id):
@@ -247,25 +690,31 @@ def create_app(test_config=None):
         if not body:
             abort(400, {'message': 'Invalid JSON'})
 
+        # only the given fields, with release_date parsed to a date
+        values, error = movie_patch(body)
+        if error:
+            abort(422, {'message': error})
+
         # fetch movie by ID
         edited_movie = Movie.query.filter(Movie.id == movie_id).one_or_none()
 
         if not edited_movie:
             abort(404, {'message': 'Movie Not Found'})
+        check_if_match(edited_movie)
 
-        # get records
-        title = body.get('title', edited_movie.title)
-        release_date = body.get('release_date', edited_movie.release_date)
         # update
-        edited_movie.title = title
-        edited_movie.release_date = release_date
-        edited_movie.update
+        for key, value in values.items():
+            setattr(edited_movie, key, value)
+        edited_movie.update()
+        table_changed(Movie)
 
-        return jsonify({
+        response = jsonify({
             'success': True,
             'edited': edited_movie.id,
             'movie': [edited_movie.format()]
         })
+        response.set_etag(row_etag(edited_movie))
+        return response
 
     @app.route('/movies/<movie_id>', methods=['DELETE'])
     @requires_auth('delete:movies')
@@ -277,14 +726,35 @@ def create_app(test_config=None):
 
         if not deleted_movie:
             abort(404, {'message': 'Movie not found'})
+        check_if_match(deleted_movie)
 
-        deleted_movie.delete
+        deleted_movie.delete()
+        table_changed(Movie)
 
         return jsonify({
             'success': True,
             'deleted': movie_id
         })
 
+    """
+    Endpoint /export GET
+    """
+
+    @app.route('/export/actors', methods=['GET'])
+    @requires_auth('read:actors')
+    def export_actors(payload):
+        return export_response(request, 'actors')
+
+    @app.route('/export/movies', methods=['GET'])
+    @requires_auth('read:movies')
+    def export_movies(payload):
+        return export_response(request, 'movies')
+
+    @app.route('/export/performances', methods=['GET'])
+    @requires_auth(all_of=['read:actors', 'read:movies'])
+    def export_performances(payload):
+        return export_response(request, 'performances')
+
     """
     Error Handler Functions
     """
@@ -304,6 +774,14 @@ def create_app(test_config=None):
             "message": get_error_message(error, "Resource Not Found")
         }), 404
 
+    @app.errorhandler(412)
+    def precondition_failed(error):
+        return jsonify({
+            "success": False,
+            "error": 412,
+            "message": get_error_message(error, "Precondition Failed")
+        }), 412
+
     @app.errorhandler(422)
     def unprocessable(error):
         return jsonify({
@@ -314,6 +792,7 @@ def create_app(test_config=None):
 
     @app.errorhandler(AuthError)
     def authentification_failed(AuthError):
+        mark_error('AuthError')
         return jsonify({
             "success": False,
             "error": AuthError.status_code,
@@ -323,8 +802,26 @@ def create_app(test_config=None):
     return app
 
 
-APP = create_app()
+def after_fork(app):
+    # a forked worker must not reuse connections or locks of the master
+    with app.app_context():
+        db.engine.dispose()
+    jwks_store.after_fork()
+    token_cache.after_fork()
+    if response_cache.backend is not None:
+        response_cache.backend.after_fork()
+
+
+def __getattr__(name):
+    # APP is only built on first access, importing app does no work
+    if name == 'APP':
+        global APP
+        APP = create_app()
+        return APP
+    raise AttributeError(
+        "module {!r} has no attribute {!r}".format(__name__, name))
+
 
 if __name__ == '__main__':
     port = int(os.environ.get("PORT", 5000))
-    APP.run(host='0.0.0.0', port=port, debug=True)
+    create_app().run(host='0.0.0.0', port=port, debug=True)
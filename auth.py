@@ -1,10 +1,18 @@
-from flask import request, _request_ctx_stack, abort
-from jose import jwt
+from flask import request, _request_ctx_stack, abort, g
+from jose import jwt, jwk
+import hashlib
 import json
+import logging
+import threading
+import time
+from collections import OrderedDict
 from functools import wraps
-from config import auth0_config
+from config import auth0_config, jwks_cache, token_cache as token_cache_config
+from instrumentation import phase
 from urllib.request import urlopen
 
+logger = logging.getLogger(__name__)
+
 """
 Auth0 Config
 """
@@ -14,6 +22,7 @@ ALGORITHMS = auth0_config['ALGORITHMS']
 API_AUDIENCE = auth0_config['API_AUDIENCE']
 AUTH0_CALLBACK_URL = auth0_config['AUTH0_CALLBACK_URL']
 AUTH0_CLIENT_ID = auth0_config['AUTH0_CLIENT_ID']
+JWKS_URL = auth0_config['JWKS_URL']
 
 """
 AuthError
@@ -26,6 +35,231 @@ class AuthError(Exception):
         self.status_code = status_code
 
 
+"""
+JWKS Key Store
+
+Signing keys are fetched once, checked and cached by kid as JWK dicts.
+Before the ttl runs out a background thread refreshes them; an unknown
+kid triggers at most one synchronous refetch per kid_miss_interval. If a
+refresh fails the previous keys keep being served and the next background
+refresh waits retry_interval seconds.
+"""
+
+
+class JWKSStore:
+    def __init__(self, url, ttl=600, refresh_ahead=60,
+                 kid_miss_interval=30, timeout=5, retry_interval=30):
+        self.url = url
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self.kid_miss_interval = kid_miss_interval
+        self.retry_interval = retry_interval
+        self.timeout = timeout
+
+        self.hits = 0
+        self.misses = 0
+        self.fetches = 0
+        self.fetch_errors = 0
+
+        self._keys = {}
+        self._expires_at = 0
+        self._last_fetch = None
+        self._last_ok = False
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+
+    def _fetch(self):
+        with urlopen(self.url, timeout=self.timeout) as jsonurl:
+            jwks = json.loads(jsonurl.read())
+
+        keys = {}
+        for key in jwks['keys']:
+            rsa_key = {
+                'kty': key['kty'],
+                'kid': key['kid'],
+                'use': key.get('use', 'sig'),
+                'n': key['n'],
+                'e': key['e']
+            }
+            # jwt.decode() of the pinned python-jose-cryptodome only takes
+            # the dict, so construct() is just a check here
+            try:
+                jwk.construct(rsa_key, key.get('alg', ALGORITHMS))
+            except Exception:
+                logger.warning('Skipping unusable JWKS key %s', key['kid'])
+                continue
+            keys[key['kid']] = rsa_key
+        return keys
+
+    def refresh(self):
+        # serialise fetches; a caller that waited on another fetch reuses
+        # its outcome
+        started = time.monotonic()
+        with self._fetch_lock:
+            if self._last_fetch is not None and self._last_fetch >= started:
+                return self._last_ok
+
+            self.fetches += 1
+            try:
+                with phase('jwks'):
+                    keys = self._fetch()
+            except Exception:
+                self.fetch_errors += 1
+                logger.exception('JWKS refresh from %s failed', self.url)
+                # back off: the next background refresh is due in
+                # retry_interval, not on the very next request
+                with self._lock:
+                    self._expires_at = time.monotonic() + \
+                        self.refresh_ahead + self.retry_interval
+                self._last_ok = False
+                return False
+            finally:
+                self._last_fetch = time.monotonic()
+
+            with self._lock:
+                self._keys = keys
+                self._expires_at = time.monotonic() + self.ttl
+            self._last_ok = True
+            return True
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name='jwks-refresh', daemon=True).start()
+
+    def after_fork(self):
+        # a refresh thread of the parent does not exist in the child
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+        self._refreshing = False
+
+    def get_key(self, kid):
+        if self._last_fetch is None:
+            self.refresh()
+        elif time.monotonic() >= self._expires_at - self.refresh_ahead:
+            self._refresh_in_background()
+
+        key = self._keys.get(kid)
+        if key is not None:
+            self.hits += 1
+            return key
+
+        self.misses += 1
+        if time.monotonic() - self._last_fetch >= self.kid_miss_interval:
+            self.refresh()
+            key = self._keys.get(kid)
+        return key
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'keys': len(self._keys),
+            'hits': self.hits,
+            'misses': self.misses,
+            'fetches': self.fetches,
+            'fetch_errors': self.fetch_errors,
+            'hit_ratio': self.hits / lookups if lookups else 0.0
+        }
+
+
+jwks_store = JWKSStore(
+    JWKS_URL,
+    ttl=jwks_cache['ttl'],
+    refresh_ahead=jwks_cache['refresh_ahead'],
+    kid_miss_interval=jwks_cache['kid_miss_interval'],
+    timeout=jwks_cache['timeout'],
+    retry_interval=jwks_cache['retry_interval'])
+
+
+"""
+Verified Token Cache
+
+Bounded LRU of decoded payloads keyed by a sha256 of the bearer token, so a
+token seen again skips header parsing and the RSA signature check. The
+token's permissions are stored next to the payload as a frozenset. Entries
+expire no later than the token's exp claim.
+"""
+
+
+class TokenCache:
+    def __init__(self, max_size=1024, max_ttl=300):
+        self.max_size = max_size
+        self.max_ttl = max_ttl
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token):
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token):
+        if self.max_size <= 0:
+            return None
+
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0], entry[1]
+
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, token, payload, permissions=None):
+        if self.max_size <= 0:
+            return
+
+        expires_at = time.time() + self.max_ttl
+        if 'exp' in payload:
+            expires_at = min(expires_at, payload['exp'])
+
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (payload, permissions, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def after_fork(self):
+        self._lock = threading.Lock()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0
+        }
+
+
+token_cache = TokenCache(
+    max_size=token_cache_config['max_size'],
+    max_ttl=token_cache_config['max_ttl'])
+
+
 """
 Auth Functions
 """
@@ -64,34 +298,24 @@ def get_token_auth_header():
 
 
 def verify_decode_jwt(token):
-    jsonurl = urlopen(f'https://{AUTH0_DOMAIN}/.well-known/jwks.json')
-    jwks = json.loads(jsonurl.read())
     unverified_header = jwt.get_unverified_header(token)
-    rsa_key = {}
     if 'kid' not in unverified_header:
         raise AuthError({
             'code': 'invalid_header',
             'description': 'Authorization malformed.'
         }, 401)
 
-    for key in jwks['keys']:
-        if key['kid'] == unverified_header['kid']:
-            rsa_key = {
-                'kty': key['kty'],
-                'kid': key['kid'],
-                'use': key['use'],
-                'n': key['n'],
-                'e': key['e']
-            }
+    rsa_key = jwks_store.get_key(unverified_header['kid'])
     if rsa_key:
         try:
-            payload = jwt.decode(
-                token,
-                rsa_key,
-                algorithms=ALGORITHMS,
-                audience=API_AUDIENCE,
-                issuer='https://' + AUTH0_DOMAIN + '/'
-            )
+            with phase('jwt'):
+                payload = jwt.decode(
+                    token,
+                    rsa_key,
+                    algorithms=ALGORITHMS,
+                    audience=API_AUDIENCE,
+                    issuer='https://' + AUTH0_DOMAIN + '/'
+                )
 
             return payload
 
@@ -117,14 +341,33 @@ def verify_decode_jwt(token):
     }, 400)
 
 
-def check_permissions(permission, payload):
+def compile_permissions(payload):
+    # None marks a token without a permissions claim
     if 'permissions' not in payload:
+        return None
+    return frozenset(payload['permissions'])
+
+
+def check_permissions(permission, payload, permissions=None,
+                      any_of=frozenset(), all_of=frozenset()):
+    if permissions is None:
+        permissions = compile_permissions(payload)
+
+    if permissions is None:
         raise AuthError({
             'code': 'invalid_claims',
             'description': 'Permissions not included in JWT.'
         }, 400)
 
-    if permission not in payload['permissions']:
+    if permission or not (any_of or all_of):
+        if permission not in permissions:
+            raise AuthError({
+                'code': 'unauthorized',
+                'description': 'Permission not found.'
+            }, 401)
+
+    if not all_of <= permissions or \
+            (any_of and permissions.isdisjoint(any_of)):
         raise AuthError({
             'code': 'unauthorized',
             'description': 'Permission not found.'
@@ -133,18 +376,36 @@ def check_permissions(permission, payload):
     return True
 
 
-# decorater method
-def requires_auth(permission=''):
-    def requires_auth_decorator(f):
-        @wraps(f)
-        def wrapper(*args, **kwargs):
-            token = get_token_auth_header()
+def authorize(permission='', any_of=frozenset(), all_of=frozenset()):
+    # verifies the request's token and permissions, returns the payload
+    with phase('auth'):
+        token = get_token_auth_header()
+        cached = token_cache.get(token)
+        if cached is None:
             try:
                 payload = verify_decode_jwt(token)
             except Exception:
                 abort(401)
+            permissions = compile_permissions(payload)
+            token_cache.put(token, payload, permissions)
+        else:
+            payload, permissions = cached
+
+        check_permissions(permission, payload, permissions,
+                          any_of=any_of, all_of=all_of)
+    g.permissions = permissions
+    return payload
 
-            check_permissions(permission, payload)
+
+# decorater method
+def requires_auth(permission='', any_of=(), all_of=()):
+    any_of = frozenset(any_of)
+    all_of = frozenset(all_of)
+
+    def requires_auth_decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            payload = authorize(permission, any_of=any_of, all_of=all_of)
             return f(payload, *args, **kwargs)
 
         return wrapper
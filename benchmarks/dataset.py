@@ -0,0 +1,86 @@
+"""
+Synthetic dataset for the benchmarks.
+
+    from benchmarks.dataset import seed
+    seed(actors=1000, movies=200, performances=5000)
+
+Rows are generated from a fixed random seed, so every run sees the same
+data.
+"""
+import os
+import random
+from datetime import date, timedelta
+
+from models import db, bump_version, Actor, Movie, Performance
+
+GENDERS = ('Male', 'Female', 'Unknown')
+
+FIRST_NAMES = (
+    'Anna', 'Ben', 'Carla', 'David', 'Elena', 'Frank', 'Grace', 'Hugo',
+    'Iris', 'Jack', 'Kate', 'Leo', 'Maria', 'Nina', 'Oscar', 'Paula',
+    'Quinn', 'Rosa', 'Sam', 'Tom', 'Uma', 'Victor', 'Wendy', 'Yusuf')
+LAST_NAMES = (
+    'Adams', 'Baker', 'Clark', 'Davis', 'Evans', 'Fisher', 'Garcia',
+    'Hanks', 'Ito', 'Jones', 'Khan', 'Lopez', 'Miller', 'Novak', 'Okafor',
+    'Park', 'Quinn', 'Rossi', 'Smith', 'Tanaka', 'Usman', 'Weber')
+TITLE_WORDS = (
+    'Dark', 'Night', 'Last', 'Star', 'River', 'Code', 'Storm', 'Silent',
+    'Golden', 'City', 'Empire', 'Ghost', 'Lost', 'Summer', 'Winter',
+    'Return', 'Rise', 'Shadow', 'Six', 'Pack', 'Coder', 'Ocean', 'Fire')
+
+
+def database_url(directory, filename='bench.db'):
+    # the benchmarks drop and reseed the schema, so they never read
+    # DATABASE_URL (setup.sh points it at the dev database)
+    return os.environ.get('BENCHMARK_DATABASE_URL',
+                          'sqlite:///' + os.path.join(directory, filename))
+
+
+def seed(actors=1000, movies=200, performances=5000, random_seed=1,
+         batch_size=1000):
+    rng = random.Random(random_seed)
+
+    actor_rows = [{
+        'name': '{} {}'.format(
+            rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)),
+        'gender': rng.choice(GENDERS),
+        'age': rng.randint(18, 90)
+    } for _ in range(actors)]
+
+    movie_rows = [{
+        'title': ' '.join(rng.sample(TITLE_WORDS, rng.randint(1, 3))),
+        'release_date': date(1950, 1, 1) + timedelta(
+            days=rng.randint(0, 365 * 75))
+    } for _ in range(movies)]
+
+    _insert(Actor.__table__, actor_rows, batch_size)
+    _insert(Movie.__table__, movie_rows, batch_size)
+
+    actor_ids = [row[0] for row in db.session.query(Actor.id)]
+    movie_ids = [row[0] for row in db.session.query(Movie.id)]
+
+    # unique (movie, actor) pairs, skipping any cast rows already present
+    existing = set(db.session.query(
+        Performance.c.Movie_id, Performance.c.Actor_id))
+    pairs = set()
+    performances = min(performances,
+                       len(actor_ids) * len(movie_ids) - len(existing))
+    while len(pairs) < performances:
+        pair = (rng.choice(movie_ids), rng.choice(actor_ids))
+        if pair not in existing:
+            pairs.add(pair)
+
+    _insert(Performance, [{
+        'Movie_id': movie_id,
+        'Actor_id': actor_id,
+        'actor_fee': round(rng.uniform(1000, 1000000), 2)
+    } for movie_id, actor_id in sorted(pairs)], batch_size)
+
+    bump_version(Actor.__tablename__)
+    bump_version(Movie.__tablename__)
+    db.session.commit()
+
+
+def _insert(table, rows, batch_size):
+    for start in range(0, len(rows), batch_size):
+        db.session.execute(table.insert(), rows[start:start + batch_size])
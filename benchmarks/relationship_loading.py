@@ -0,0 +1,89 @@
+"""
+Relationship loading benchmark
+
+Compares loading actors with the old joined eager load of
+Actor.performances (every actor LEFT OUTER JOINed through Performance into
+movies) against the lazy default, on a seeded dataset.
+
+    python -m benchmarks.relationship_loading --actors 2000
+
+Reports rows fetched from the database and median latency as JSON.
+"""
+import argparse
+import json
+import statistics
+import tempfile
+import time
+
+from sqlalchemy.orm import joinedload
+
+from app import create_app
+from models import db, Actor
+from benchmarks.dataset import database_url, seed
+
+
+def measure(query, runs):
+    rows = len(db.session.execute(query.statement).fetchall())
+
+    timings = []
+    for _ in range(runs):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        query.all()
+        timings.append(time.perf_counter() - started)
+
+    return {'rows': rows, 'median_ms': statistics.median(timings) * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--actors', type=int, default=2000)
+    parser.add_argument('--movies', type=int, default=400)
+    parser.add_argument('--performances', type=int, default=20000)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            'STARTUP_MODE': 'test',
+            'DATABASE_URL': database_url(tmp)
+        })
+
+        with app.app_context():
+            seed(args.actors, args.movies, args.performances)
+
+            scenarios = {
+                'actors_list': {
+                    'joined': Actor.query.options(
+                        joinedload(Actor.performances)),
+                    'lazy': Actor.query
+                },
+                'actor_lookup': {
+                    'joined': Actor.query.options(
+                        joinedload(Actor.performances))
+                    .filter(Actor.id == 1),
+                    'lazy': Actor.query.filter(Actor.id == 1)
+                }
+            }
+
+            results = {
+                name: {
+                    strategy: measure(query, args.runs)
+                    for strategy, query in strategies.items()
+                }
+                for name, strategies in scenarios.items()
+            }
+
+    print(json.dumps({
+        'benchmark': 'relationship_loading',
+        'dataset': {
+            'actors': args.actors,
+            'movies': args.movies,
+            'performances': args.performances
+        },
+        'results': results
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,305 @@
+"""
+Scenario load benchmark
+
+Seeds a synthetic dataset, mints tokens for each role from a local signing
+key, then replays list, detail, write and bulk requests through the Flask
+test client and through a real WSGI server on a local port. No network
+access is needed.
+
+    python -m benchmarks.scenarios --actors 5000 --movies 1000 \\
+        --performances 20000 --requests 200 --output run.json
+
+Prints per-scenario latency percentiles, throughput and status counts as
+JSON (and writes them to --output), so two runs can be diffed.
+"""
+import argparse
+import http.client
+import json
+import logging
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from werkzeug.serving import make_server
+
+from app import create_app
+from cache import response_cache
+from compression import encoders
+from models import db, Actor, Movie
+from serializers import serializer
+from benchmarks.dataset import database_url, seed
+from benchmarks.tokens import LocalIssuer
+
+"""
+Scenarios
+
+Each scenario returns the next request as (method, path, role, body).
+Reads go through the least privileged role that may make them.
+"""
+
+
+class Scenarios:
+    def __init__(self, actor_ids, movie_ids, random_seed):
+        self.rng = random.Random(random_seed)
+        self.actor_ids = actor_ids
+        self.movie_ids = movie_ids
+
+    def list_actors(self, last):
+        pages = max(1, len(self.actor_ids) // 50)
+        return ('GET', '/actors?per_page=50&page={}'.format(
+            self.rng.randint(1, pages)), 'casting_assistant', None)
+
+    def list_movies_with_cast(self, last):
+        pages = max(1, len(self.movie_ids) // 20)
+        return ('GET', '/movies?per_page=20&include=actors&page={}'.format(
+            self.rng.randint(1, pages)), 'casting_assistant', None)
+
+    def list_actors_keyset(self, last):
+        # walks the whole table page by page, then starts over
+        cursor = last.get('next_cursor') if last else None
+        path = '/actors?per_page=50&after={}'.format(cursor or '')
+        return ('GET', path, 'casting_assistant', None)
+
+    def search(self, last):
+        query = self.rng.choice(('to', 'ann', 'dark', 'star co', 'quinn'))
+        return ('GET', '/search?q=' + query.replace(' ', '+'),
+                'casting_assistant', None)
+
+    def actor_detail(self, last):
+        return ('GET', '/actors/{}'.format(self.rng.choice(self.actor_ids)),
+                'casting_assistant', None)
+
+    def movie_detail(self, last):
+        return ('GET', '/movies/{}'.format(self.rng.choice(self.movie_ids)),
+                'casting_assistant', None)
+
+    def edit_actor(self, last):
+        return ('PATCH', '/actors/{}'.format(self.rng.choice(self.actor_ids)),
+                'casting_director', {'age': self.rng.randint(18, 90)})
+
+    def create_movie(self, last):
+        return ('POST', '/movies', 'executive_producer', {
+            'title': 'Benchmark {}'.format(self.rng.randint(0, 10 ** 9)),
+            'release_date': '2020-01-{:02d}'.format(self.rng.randint(1, 28))
+        })
+
+    def bulk_create_actors(self, last):
+        return ('POST', '/actors/bulk', 'casting_director', [{
+            'name': 'Bulk Actor {}'.format(self.rng.randint(0, 10 ** 9)),
+            'gender': self.rng.choice(('Male', 'Female', 'Unknown')),
+            'age': self.rng.randint(18, 90)
+        } for _ in range(100)])
+
+    def bulk_edit_actors(self, last):
+        return ('PATCH', '/actors/bulk', 'casting_director', {
+            'ids': self.rng.sample(self.actor_ids, 100),
+            'values': {'age': self.rng.randint(18, 90)}
+        })
+
+
+# scenario groups, in the order they run; writes come last so the reads
+# see the seeded data
+GROUPS = {
+    'list': ('list_actors', 'list_movies_with_cast', 'list_actors_keyset',
+             'search'),
+    'detail': ('actor_detail', 'movie_detail'),
+    'write': ('edit_actor', 'create_movie'),
+    'bulk': ('bulk_create_actors', 'bulk_edit_actors')
+}
+
+"""
+Drivers
+"""
+
+
+class TestClientDriver:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, headers, body):
+        response = self.client.open(
+            path, method=method, headers=headers,
+            json=body)
+        return response.status_code, response.get_data()
+
+    def close(self):
+        pass
+
+
+class WSGIServerDriver:
+    # werkzeug's server in a thread; http.client reconnects whenever the
+    # server closes the connection after a response
+    def __init__(self, app):
+        # the per-request access log would dominate the timings
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        self.server = make_server('127.0.0.1', 0, app, threaded=False)
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, name='benchmark-server',
+            daemon=True)
+        self.thread.start()
+        self.connection = http.client.HTTPConnection(
+            '127.0.0.1', self.server.server_port, timeout=30)
+
+    def request(self, method, path, headers, body):
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers = dict(headers, **{'Content-Type': 'application/json'})
+        self.connection.request(method, path, payload, headers)
+        response = self.connection.getresponse()
+        return response.status, response.read()
+
+    def close(self):
+        self.connection.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+DRIVERS = {
+    'test_client': TestClientDriver,
+    'wsgi_server': WSGIServerDriver
+}
+
+"""
+Runner
+"""
+
+
+def percentile(timings, fraction):
+    return timings[max(0, int(round(len(timings) * fraction)) - 1)]
+
+
+def run_scenario(driver, scenario, headers, requests, warmup):
+    timings = []
+    statuses = {}
+    last = None
+    started = time.perf_counter()
+    for number in range(warmup + requests):
+        method, path, role, body = scenario(last)
+        request_started = time.perf_counter()
+        status, data = driver.request(method, path, headers[role], body)
+        elapsed = time.perf_counter() - request_started
+
+        try:
+            last = json.loads(data) if status == 200 else None
+        except ValueError:
+            last = None
+
+        if number == warmup - 1:
+            started = time.perf_counter()
+        if number >= warmup:
+            timings.append(elapsed)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    total = time.perf_counter() - started
+    timings.sort()
+    return {
+        'requests': len(timings),
+        'p50_ms': statistics.median(timings) * 1000,
+        'p95_ms': percentile(timings, 0.95) * 1000,
+        'p99_ms': percentile(timings, 0.99) * 1000,
+        'mean_ms': statistics.mean(timings) * 1000,
+        'requests_per_sec': len(timings) / total if total else 0.0,
+        'statuses': statuses,
+        'errors': sum(count for status, count in statuses.items()
+                      if not status.startswith('2'))
+    }
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'database': db.engine.dialect.name,
+        'serializer': type(serializer).__name__,
+        'encodings': sorted(encoders),
+        'response_cache': type(response_cache.backend).__name__
+        if response_cache.backend is not None else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--actors', type=int, default=2000)
+    parser.add_argument('--movies', type=int, default=400)
+    parser.add_argument('--performances', type=int, default=8000)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--groups', default=','.join(GROUPS))
+    parser.add_argument('--drivers', default=','.join(DRIVERS))
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    groups = args.groups.split(',')
+    drivers = args.drivers.split(',')
+    unknown = set(groups) - set(GROUPS) | set(drivers) - set(DRIVERS)
+    if unknown:
+        parser.error('unknown group or driver: ' + ', '.join(sorted(unknown)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        issuer = LocalIssuer(tmp)
+        issuer.install()
+
+        app = create_app({
+            'STARTUP_MODE': 'test',
+            'DATABASE_URL': database_url(tmp)
+        })
+
+        with app.app_context():
+            seed(actors=args.actors, movies=args.movies,
+                 performances=args.performances, random_seed=args.seed)
+            actor_ids = [row[0] for row in db.session.query(Actor.id)]
+            movie_ids = [row[0] for row in db.session.query(Movie.id)]
+            info = environment()
+            db.session.remove()
+
+        headers = {role: issuer.headers(role) for role in (
+            'casting_assistant', 'casting_director', 'executive_producer')}
+
+        results = {}
+        for driver_name in drivers:
+            driver = DRIVERS[driver_name](app)
+            # every driver replays the same request sequence
+            scenarios = Scenarios(actor_ids, movie_ids, args.seed)
+            try:
+                results[driver_name] = {
+                    name: run_scenario(
+                        driver, getattr(scenarios, name), headers,
+                        args.requests, args.warmup)
+                    for group in groups for name in GROUPS[group]
+                }
+            finally:
+                driver.close()
+
+    report = {
+        'benchmark': 'scenarios',
+        'dataset': {
+            'actors': args.actors,
+            'movies': args.movies,
+            'performances': args.performances,
+            'seed': args.seed
+        },
+        'requests': args.requests,
+        'warmup': args.warmup,
+        'environment': info,
+        'results': results
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(output + '\n')
+
+    if any(timing['errors'] for scenarios in results.values()
+           for timing in scenarios.values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
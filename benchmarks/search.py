@@ -0,0 +1,95 @@
+"""
+Search latency benchmark
+
+Seeds actors and movies, then times type-ahead queries through the search
+engine the app would pick for BENCHMARK_DATABASE_URL (Postgres
+tsvector/trigram, or the in-memory prefix index on sqlite).
+
+    BENCHMARK_DATABASE_URL=postgresql://... \\
+        python -m benchmarks.search --rows 1000000
+
+Prints p50/p95 per query as JSON and exits non-zero when any p95 misses
+--target-ms.
+"""
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+
+from flask import request
+
+from app import create_app
+from models import Actor, Movie
+from search import search_query
+from benchmarks.dataset import database_url, seed
+
+QUERIES = {
+    Actor: ('t', 'tom', 'tom han', 'ann sm', 'quinn'),
+    Movie: ('d', 'dark', 'star co', 'six pack', 'ghost ri')
+}
+
+
+def time_query(app, model, q, runs):
+    path = '/?q={}&per_page=10'.format(q)
+    timings = []
+    for _ in range(runs + 1):
+        with app.test_request_context(path):
+            started = time.perf_counter()
+            search_query(request, model, model.query)
+            timings.append(time.perf_counter() - started)
+
+    # the first run warms caches (and builds the sqlite prefix index)
+    timings = sorted(timings[1:])
+    return {
+        'p50_ms': statistics.median(timings) * 1000,
+        'p95_ms': timings[int(len(timings) * 0.95) - 1] * 1000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--target-ms', type=float, default=20.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            'STARTUP_MODE': 'test',
+            'DATABASE_URL': database_url(tmp)
+        })
+
+        with app.app_context():
+            seed(actors=args.rows, movies=args.rows, performances=0)
+
+            results = {
+                model.__tablename__: {
+                    q: time_query(app, model, q, args.runs)
+                    for q in queries
+                }
+                for model, queries in QUERIES.items()
+            }
+
+    missed = [
+        '{}?q={}'.format(table, q)
+        for table, timings in results.items()
+        for q, timing in timings.items()
+        if timing['p95_ms'] > args.target_ms
+    ]
+
+    print(json.dumps({
+        'benchmark': 'search',
+        'rows': args.rows,
+        'target_ms': args.target_ms,
+        'results': results,
+        'missed_target': missed
+    }, indent=2))
+
+    if missed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Serialization benchmark
+
+Renders one 10k-row page of movies the old way (ORM objects, format(),
+jsonify) and through the column-tuple path with every serializer that is
+importable here, in both date formats.
+
+    python -m benchmarks.serialization --rows 10000
+
+Reports median milliseconds and rows per second as JSON.
+"""
+import argparse
+import json
+import statistics
+import tempfile
+import time
+
+from flask import jsonify
+
+from app import create_app
+from models import db, row_columns, rows_to_dicts, Movie
+from serializers import SERIALIZERS
+from benchmarks.dataset import database_url, seed
+
+
+def measure(render, rows, runs):
+    timings = []
+    for _ in range(runs):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        render()
+        timings.append(time.perf_counter() - started)
+
+    median = statistics.median(timings)
+    return {'median_ms': median * 1000, 'rows_per_sec': rows / median}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--runs', type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            'STARTUP_MODE': 'test',
+            'DATABASE_URL': database_url(tmp)
+        })
+
+        with app.test_request_context():
+            seed(actors=0, movies=args.rows, performances=0)
+            query = Movie.query.order_by(Movie.id).limit(args.rows)
+            rows = query.count()
+
+            def orm_jsonify():
+                movies = [movie.format() for movie in query.all()]
+                return jsonify({'movies': movies}).get_data()
+
+            results = {'orm_format_jsonify': measure(
+                orm_jsonify, rows, args.runs)}
+
+            columns = row_columns(Movie)
+            for name, serializer_class in sorted(SERIALIZERS.items()):
+                for date_format in ('http', 'iso'):
+                    try:
+                        serializer = serializer_class(date_format)
+                    except ImportError:
+                        continue
+
+                    def columns_dumps():
+                        movies = rows_to_dicts(
+                            columns, query.with_entities(*columns).all())
+                        return serializer.dumps({'movies': movies})
+
+                    results['columns_{}_{}'.format(name, date_format)] = \
+                        measure(columns_dumps, rows, args.runs)
+
+    print(json.dumps({
+        'benchmark': 'serialization',
+        'rows': rows,
+        'results': results
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
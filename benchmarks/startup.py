@@ -0,0 +1,65 @@
+"""
+Startup benchmark
+
+Times a cold `import app` plus `create_app()` in a fresh interpreter for
+each startup mode, the same work a gunicorn worker does on boot.
+
+    python -m benchmarks.startup --runs 5
+
+BENCHMARK_DATABASE_URL defaults to a throwaway sqlite file so it runs
+without postgres; point it at a scratch database to measure the DDL round
+trips (the test mode drops its tables).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.dataset import database_url
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SNIPPET = '''
+import time
+started = time.perf_counter()
+import app
+app.create_app()
+print(time.perf_counter() - started)
+'''
+
+
+def time_startup(mode, url):
+    env = dict(os.environ, STARTUP_MODE=mode, DATABASE_URL=url)
+    output = subprocess.check_output(
+        [sys.executable, '-c', SNIPPET], cwd=ROOT, env=env)
+    return float(output.decode().strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--modes', default='production,dev,test')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = database_url(tmp, 'startup.db')
+
+        results = {}
+        for mode in args.modes.split(','):
+            timings = [time_startup(mode, url)
+                       for _ in range(args.runs)]
+            results[mode] = {
+                'runs': args.runs,
+                'median_ms': statistics.median(timings) * 1000,
+                'min_ms': min(timings) * 1000,
+                'max_ms': max(timings) * 1000
+            }
+
+    print(json.dumps({'benchmark': 'startup', 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Local signing key and stub JWKS for the benchmarks.
+
+    from benchmarks.tokens import LocalIssuer
+    issuer = LocalIssuer(directory)
+    issuer.install()
+    headers = issuer.headers('casting_director')
+
+Generates an RSA key, writes its public half as a JWKS file and points
+the app's key store at it, so tokens for every role can be minted and
+verified without Auth0 or any network access.
+"""
+import base64
+import json
+import os
+import time
+
+from Crypto.PublicKey import RSA
+from jose import jwt
+
+from auth import ALGORITHMS, API_AUDIENCE, AUTH0_DOMAIN
+from auth import jwks_store, token_cache
+
+KID = 'benchmark-key'
+
+# the permissions of the Auth0 roles listed in the README
+ROLES = {
+    'casting_assistant': ['read:actors', 'read:movies'],
+    'casting_director': [
+        'read:actors', 'read:movies', 'create:actors', 'delete:actors',
+        'edit:actors', 'edit:movies'],
+    'executive_producer': [
+        'read:actors', 'read:movies', 'create:actors', 'delete:actors',
+        'edit:actors', 'edit:movies', 'create:movies', 'delete:movies']
+}
+
+
+def b64_uint(value):
+    raw = value.to_bytes((value.bit_length() + 7) // 8, 'big')
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+class LocalIssuer:
+    def __init__(self, directory, bits=2048):
+        self.key = RSA.generate(bits)
+        self.private_pem = self.key.export_key().decode()
+        self.jwks_path = os.path.join(directory, 'jwks.json')
+        with open(self.jwks_path, 'w') as jwks_file:
+            json.dump({'keys': [{
+                'kty': 'RSA',
+                'kid': KID,
+                'use': 'sig',
+                'alg': 'RS256',
+                'n': b64_uint(self.key.n),
+                'e': b64_uint(self.key.e)
+            }]}, jwks_file)
+
+    def install(self):
+        # the store fetches file:// URLs like any other
+        jwks_store.url = 'file://' + self.jwks_path
+        jwks_store.refresh()
+        token_cache.clear()
+
+    def token(self, role, ttl=3600):
+        now = int(time.time())
+        return jwt.encode({
+            'iss': 'https://' + AUTH0_DOMAIN + '/',
+            'aud': API_AUDIENCE,
+            'sub': 'benchmark|' + role,
+            'iat': now,
+            'exp': now + ttl,
+            'permissions': ROLES[role]
+        }, self.private_pem, algorithm=ALGORITHMS,
+            headers={'kid': KID})
+
+    def headers(self, role):
+        return {'Authorization': 'Bearer ' + self.token(role)}
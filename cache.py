@@ -0,0 +1,218 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import timezone
+from functools import wraps
+from flask import Response, abort, g, make_response, request
+from config import response_cache as response_cache_config
+from compression import choose_encoding, encode_response, etag_variants
+from models import table_versions
+
+"""
+Response Cache
+
+Successful GET responses are stored as ready-to-send (and compressed)
+bytes, keyed by endpoint, URL and query arguments, the caller's
+permissions, the chosen Content-Encoding and the table_versions row of
+every table the endpoint reads. Writes bump that row in the same
+transaction (models.bump_version), which retires all cached responses
+built from the table at once, in every worker; the stale entries simply
+age out of the backend. The versions are read once per request and shared
+with the conditional ETag.
+"""
+
+
+class MemoryBackend:
+    # in-process LRU with a ttl per entry, one per worker
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def after_fork(self):
+        self._lock = threading.Lock()
+
+
+class RedisBackend:
+    # any client with get/set(ex=) works, e.g. a fake in tests; shared by
+    # all workers
+    def __init__(self, client):
+        self.client = client
+
+    @classmethod
+    def from_url(cls, url):
+        import redis
+        return cls(redis.Redis.from_url(url))
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, value, ttl):
+        self.client.set(key, value, ex=ttl)
+
+    def after_fork(self):
+        pass
+
+
+class ResponseCache:
+    def __init__(self, backend=None, ttl=60):
+        self.backend = backend
+        self.ttl = ttl
+
+    def key(self, tables):
+        versions = current_versions(tables)
+        path = sorted((request.view_args or {}).items())
+        query = sorted(request.args.items(multi=True))
+        scope = ','.join(sorted(g.get('permissions') or ()))
+        digest = hashlib.sha1(
+            repr((path, query, scope)).encode()).hexdigest()
+        return 'resp:{}:{}:{}:{}'.format(
+            request.endpoint,
+            '.'.join(str(versions[table][0]) for table in tables),
+            choose_encoding('application/json') or 'identity',
+            digest)
+
+    def cached(self, *tables):
+        def cached_decorator(f):
+            @wraps(f)
+            def wrapper(*args, **kwargs):
+                if self.backend is None:
+                    return f(*args, **kwargs)
+
+                key = self.key(tables)
+                entry = self.backend.get(key)
+                if entry is not None:
+                    # b'<content-encoding>:<body>', stored already encoded
+                    encoding, _, body = entry.partition(b':')
+                    response = Response(body, mimetype='application/json')
+                    if encoding:
+                        response.headers['Content-Encoding'] = \
+                            encoding.decode()
+                    return response
+
+                response = f(*args, **kwargs)
+                if isinstance(response, Response) and \
+                        response.status_code == 200:
+                    encode_response(response)
+                    encoding = response.headers.get('Content-Encoding', '')
+                    self.backend.set(
+                        key, encoding.encode() + b':' + response.get_data(),
+                        self.ttl)
+                return response
+
+            return wrapper
+        return cached_decorator
+
+
+def build_backend(config=response_cache_config):
+    if config['backend'] == 'memory':
+        return MemoryBackend(config['max_entries'])
+    if config['backend'] == 'redis':
+        return RedisBackend.from_url(config['redis_url'])
+    return None
+
+
+response_cache = ResponseCache(
+    build_backend(), ttl=response_cache_config['ttl'])
+
+
+def current_versions(tables):
+    # one table_versions lookup per request, shared by the ETag and the key
+    versions = g.setdefault('table_versions', {})
+    missing = [table for table in tables if table not in versions]
+    if missing:
+        versions.update(table_versions(missing))
+    return versions
+
+
+"""
+Conditional Requests
+
+List endpoints get a strong ETag built from the request and the
+table_versions rows of every table they read, so an unchanged poll costs
+one primary key lookup and an empty 304. Single rows are tagged from
+their id and updated_at, which also backs If-Match on PATCH/DELETE.
+"""
+
+
+def not_modified(etag, last_modified=None):
+    # 304 if If-None-Match (or, without it, If-Modified-Since) matches; the
+    # 304 names the encoded variant the client holds, e.g. "<etag>-gzip"
+    matched = None
+    if request.if_none_match:
+        matched = next((tag for tag in etag_variants(etag)
+                        if request.if_none_match.contains_weak(tag)), None)
+    elif last_modified is not None and request.if_modified_since:
+        if last_modified.replace(microsecond=0, tzinfo=timezone.utc) <= \
+                request.if_modified_since:
+            matched = etag
+
+    if matched is None:
+        return None
+    response = Response(status=304)
+    response.set_etag(matched)
+    response.last_modified = last_modified
+    return response
+
+
+def conditional(*tables):
+    def conditional_decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            versions = current_versions(tables)
+            etag = hashlib.sha1(repr((
+                request.endpoint,
+                sorted(kwargs.items()),
+                sorted(request.args.items(multi=True)),
+                sorted(g.get('permissions') or ()),
+                [versions[table][0] for table in tables]
+            )).encode()).hexdigest()
+            stamps = [versions[table][1] for table in tables
+                      if versions[table][1] is not None]
+            last_modified = max(stamps) if stamps else None
+
+            response = not_modified(etag, last_modified)
+            if response is not None:
+                return response
+
+            response = make_response(f(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag)
+                response.last_modified = last_modified
+            return response
+
+        return wrapper
+    return conditional_decorator
+
+
+def row_etag(row):
+    return hashlib.sha1(repr((
+        row.__tablename__, row.id, row.updated_at.isoformat()
+    )).encode()).hexdigest()
+
+
+def check_if_match(row):
+    # optimistic concurrency: the client must hold the current version
+    if request.if_match and not any(
+            request.if_match.contains(tag)
+            for tag in etag_variants(row_etag(row))):
+        abort(412, {'message': 'Resource was modified, fetch it again'})
@@ -0,0 +1,153 @@
+import zlib
+from flask import request
+from config import compression as compression_config
+from instrumentation import phase
+
+"""
+Compression
+
+Responses are compressed in an after_request hook with the best encoding
+the client accepts. Buffered bodies below min_size are left alone;
+streamed bodies (exports) are compressed chunk by chunk as they are sent.
+The response cache stores bodies already encoded (encode_response()), so
+a hit costs no compression at all. Encoded responses get the encoding
+appended to their ETag, and the conditional checks accept both forms.
+"""
+
+COMPRESSIBLE = ('application/json', 'application/x-ndjson', 'text/')
+
+
+class GzipEncoder:
+    name = 'gzip'
+
+    def __init__(self, level=6):
+        self.level = level
+
+    def compressor(self):
+        # wbits=31 writes a gzip header with no timestamp, so the output
+        # for a given body is always the same
+        return zlib.compressobj(self.level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        compressor = self.compressor()
+        return compressor.compress(data) + compressor.flush()
+
+    def stream(self, chunks):
+        compressor = self.compressor()
+        try:
+            for chunk in chunks:
+                data = compressor.compress(chunk)
+                if data:
+                    yield data
+            yield compressor.flush()
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+
+
+class BrotliEncoder:
+    name = 'br'
+
+    def __init__(self, quality=4):
+        import brotli
+        self.brotli = brotli
+        self.quality = quality
+
+    def compress(self, data):
+        return self.brotli.compress(data, quality=self.quality)
+
+    def stream(self, chunks):
+        compressor = self.brotli.Compressor(quality=self.quality)
+        try:
+            for chunk in chunks:
+                data = compressor.process(chunk)
+                if data:
+                    yield data
+            yield compressor.finish()
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+
+
+def build_encoders(config=compression_config):
+    encoders = {}
+    for name in filter(None, config['encodings'].split(',')):
+        name = name.strip()
+        if name == 'gzip':
+            encoders[name] = GzipEncoder(config['gzip_level'])
+        elif name == 'br':
+            try:
+                encoders[name] = BrotliEncoder(config['brotli_quality'])
+            except ImportError:
+                continue
+        else:
+            raise ValueError('Unknown encoding {}'.format(name))
+    return encoders
+
+
+encoders = build_encoders()
+MIN_SIZE = compression_config['min_size']
+
+
+def compressible(mimetype):
+    return bool(mimetype) and mimetype.startswith(COMPRESSIBLE)
+
+
+def choose_encoding(mimetype):
+    # best offered encoding the client accepts, None for identity
+    if not encoders or not compressible(mimetype):
+        return None
+    return request.accept_encodings.best_match(list(encoders))
+
+
+def etag_variants(etag):
+    return [etag] + ['{}-{}'.format(etag, name) for name in encoders]
+
+
+def encode_response(response):
+    # compress a buffered response in place, if it is worth it
+    encoding = choose_encoding(response.mimetype)
+    if encoding is None or response.is_streamed:
+        return response
+
+    data = response.get_data()
+    if len(data) < MIN_SIZE:
+        return response
+
+    with phase('compress'):
+        response.set_data(encoders[encoding].compress(data))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def compress_response(response):
+    if response.status_code < 200 or \
+            response.status_code in (204, 206, 304) or \
+            response.direct_passthrough or \
+            not compressible(response.mimetype):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    if 'Content-Encoding' not in response.headers:
+        if response.is_streamed:
+            encoding = choose_encoding(response.mimetype)
+            if encoding is not None:
+                response.response = encoders[encoding].stream(
+                    response.response)
+                response.headers.pop('Content-Length', None)
+                response.headers['Content-Encoding'] = encoding
+        else:
+            encode_response(response)
+
+    # another encoding is another representation, with its own ETag
+    encoding = response.headers.get('Content-Encoding')
+    etag, weak = response.get_etag()
+    if encoding in encoders and etag and \
+            not etag.endswith('-' + encoding):
+        response.set_etag('{}-{}'.format(etag, encoding), weak)
+    return response
+
+
+def init_compression(app):
+    if encoders:
+        app.after_request(compress_response)
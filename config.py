@@ -8,11 +8,118 @@ auth0_config = {
     "ALGORITHMS": "RS256",
     "API_AUDIENCE": "http://127.0.0.1:5000/",
     "AUTH0_CLIENT_ID": "0wMjUCi4MrsgFoEt1seV1XcTLHc8Yl6h",
-    "AUTH0_CALLBACK_URL": "http://localhost:5000"
+    "AUTH0_CALLBACK_URL": "http://localhost:5000",
+    # can point at a local file (file:///...) or stub server in tests
+    "JWKS_URL": os.environ.get(
+        'JWKS_URL', 'https://dev-m-guru.auth0.com/.well-known/jwks.json')
+}
+
+jwks_cache = {
+    # seconds fetched signing keys are considered fresh
+    "ttl": int(os.environ.get('JWKS_TTL', 600)),
+    # start a background refresh this many seconds before the ttl runs out
+    "refresh_ahead": int(os.environ.get('JWKS_REFRESH_AHEAD', 60)),
+    # minimum seconds between refetches triggered by an unknown kid
+    "kid_miss_interval": int(os.environ.get('JWKS_KID_MISS_INTERVAL', 30)),
+    # seconds to wait before retrying a failed background refresh
+    "retry_interval": int(os.environ.get('JWKS_RETRY_INTERVAL', 30)),
+    "timeout": int(os.environ.get('JWKS_TIMEOUT', 5))
+}
+
+startup = {
+    # production: no DDL on start, schema comes from `manage.py db upgrade`
+    # dev: create missing tables and seed an empty database
+    # test: drop, recreate and seed the schema
+    "mode": os.environ.get('STARTUP_MODE', 'production')
 }
 
 pagination = {
-    "example": 10  # Limits returned rows of API
+    # default rows per page, can be changed with ?per_page=
+    "per_page": int(os.environ.get('ROWS_PER_PAGE', 10)),
+    # upper bound for ?per_page=
+    "max_per_page": int(os.environ.get('MAX_ROWS_PER_PAGE', 100)),
+    # seconds a cached COUNT(*) total is reused
+    "count_cache_ttl": int(os.environ.get('COUNT_CACHE_TTL', 30)),
+    # distinct cached totals (table + filters) kept per worker
+    "count_cache_size": int(os.environ.get('COUNT_CACHE_SIZE', 1024))
+}
+
+token_cache = {
+    # verified tokens kept in memory, 0 disables the cache
+    "max_size": int(os.environ.get('TOKEN_CACHE_SIZE', 1024)),
+    # entries never outlive the token's exp claim nor this many seconds
+    "max_ttl": int(os.environ.get('TOKEN_CACHE_MAX_TTL', 300))
+}
+
+response_cache = {
+    # memory (per worker LRU), redis (shared between workers) or none
+    "backend": os.environ.get('RESPONSE_CACHE', 'memory'),
+    "redis_url": os.environ.get('REDIS_URL', 'redis://localhost:6379/0'),
+    # seconds a cached response may be served
+    "ttl": int(os.environ.get('RESPONSE_CACHE_TTL', 60)),
+    "max_entries": int(os.environ.get('RESPONSE_CACHE_SIZE', 1024))
+}
+
+bulk = {
+    # rows per multi-row INSERT statement
+    "batch_size": int(os.environ.get('BULK_BATCH_SIZE', 1000)),
+    # items accepted by one bulk request
+    "max_items": int(os.environ.get('BULK_MAX_ITEMS', 50000))
+}
+
+export = {
+    # rows fetched per round trip from the server-side cursor
+    "batch_size": int(os.environ.get('EXPORT_BATCH_SIZE', 1000))
+}
+
+compression = {
+    # offered in this order of preference, empty disables compression;
+    # br is skipped unless the brotli package is installed
+    "encodings": os.environ.get('COMPRESS_ENCODINGS', 'br,gzip'),
+    # buffered responses below this many bytes are sent as they are
+    "min_size": int(os.environ.get('COMPRESS_MIN_SIZE', 500)),
+    # 1 (fast) to 9 (small)
+    "gzip_level": int(os.environ.get('COMPRESS_GZIP_LEVEL', 6)),
+    # 0 (fast) to 11 (small)
+    "brotli_quality": int(os.environ.get('COMPRESS_BROTLI_QUALITY', 4))
+}
+
+serializer = {
+    # orjson, json (stdlib) or auto (orjson when installed)
+    "backend": os.environ.get('JSON_SERIALIZER', 'auto'),
+    # http keeps the RFC 1123 dates jsonify has always sent, iso is faster
+    "date_format": os.environ.get('JSON_DATE_FORMAT', 'http')
+}
+
+instrumentation = {
+    # per-request phase timings, Server-Timing header and a log line;
+    # when off nothing is hooked in
+    "enabled": os.environ.get('INSTRUMENTATION', 'false') == 'true',
+    # send the timings to clients in a Server-Timing header
+    "server_timing": os.environ.get(
+        'INSTRUMENTATION_SERVER_TIMING', 'true') == 'true',
+    # requests over either budget are logged as warnings
+    "max_queries": int(os.environ.get('INSTRUMENTATION_MAX_QUERIES', 20)),
+    "max_ms": int(os.environ.get('INSTRUMENTATION_MAX_MS', 500))
+}
+
+metrics = {
+    # Prometheus text format on /metrics, unauthenticated, so off unless
+    # the port is only reachable by the scraper; with several gunicorn
+    # workers also set PROMETHEUS_MULTIPROC_DIR to an empty, writable dir
+    "enabled": os.environ.get('METRICS', 'false') == 'true',
+    "multiproc_dir": os.environ.get('PROMETHEUS_MULTIPROC_DIR', '')
+}
+
+profiling = {
+    # share of requests run under cProfile, 0.0 to 1.0
+    "sample_rate": float(os.environ.get('PROFILE_SAMPLE_RATE', 0.0)),
+    # requests sending this value in X-Profile are always profiled,
+    # empty disables the header
+    "secret": os.environ.get('PROFILE_SECRET', ''),
+    # pstats files are written here, the oldest beyond max_files removed
+    "dir": os.environ.get('PROFILE_DIR', '/tmp/casting-agency-profiles'),
+    "max_files": int(os.environ.get('PROFILE_MAX_FILES', 200))
 }
 
 bearer_tokens = {
@@ -21,6 +128,28 @@ bearer_tokens = {
     "casting_director": "Bearer <token>"
 }
 
+database_pool = {
+    # connections kept open per worker process
+    "pool_size": int(os.environ.get('DB_POOL_SIZE', 5)),
+    # extra connections allowed under bursts, closed again when returned
+    "max_overflow": int(os.environ.get('DB_MAX_OVERFLOW', 5)),
+    # seconds to wait for a free connection before failing the request
+    "pool_timeout": int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+    # recycle connections older than this (seconds), -1 disables
+    "pool_recycle": int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+    # test connections on checkout so a postgres failover does not surface
+    # as errors on the first request of every pooled connection
+    "pool_pre_ping": os.environ.get('DB_POOL_PRE_PING', 'true') == 'true',
+    # postgres statement_timeout in milliseconds, 0 disables
+    "statement_timeout": int(os.environ.get('DB_STATEMENT_TIMEOUT', 30000)),
+    # behind PgBouncer or another external pooler keep no pool of our own
+    "external_pooler": os.environ.get('DB_EXTERNAL_POOLER', 'false') == 'true',
+    # when set, pool_size + max_overflow are derived so that
+    # workers * (pool_size + max_overflow) stays within this budget
+    "max_connections": int(os.environ.get('DB_MAX_CONNECTIONS', 0)),
+    "workers": int(os.environ.get('WEB_CONCURRENCY', 1))
+}
+
 database_setup = {
     "database_name_production": "FSND_Capstone",
     "user_name": "postgres",  # default
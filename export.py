@@ -0,0 +1,101 @@
+import csv
+import io
+import json
+from datetime import date
+from flask import Response, abort, stream_with_context
+from config import export
+from models import db, Actor, Movie, Performance
+
+"""
+Export
+
+Full-table dumps as NDJSON or CSV. Rows are read as plain tuples from a
+server-side cursor (stream_results + yield_per), so the worker holds one
+batch at a time whatever the table size, and every batch is written out
+(and compressed, see compression.py) before the next one is fetched.
+"""
+
+EXPORTS = {
+    'actors': (Actor.id, Actor.name, Actor.gender, Actor.age),
+    'movies': (Movie.id, Movie.title, Movie.release_date),
+    'performances': (Performance.c.Movie_id, Performance.c.Actor_id,
+                     Performance.c.actor_fee)
+}
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+
+def export_rows(columns, batch_size=export['batch_size']):
+    # primary key order, so two dumps of the same data are equal
+    query = db.session.query(*columns) \
+        .order_by(*columns[0].table.primary_key) \
+        .execution_options(stream_results=True) \
+        .yield_per(batch_size)
+    batch = []
+    for row in query:
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def json_value(value):
+    return value.isoformat() if isinstance(value, date) else value
+
+
+def ndjson_chunks(names, batches):
+    for batch in batches:
+        yield ''.join(
+            json.dumps(dict(zip(names, map(json_value, row)))) + '\n'
+            for row in batch).encode()
+
+
+def csv_chunks(names, batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        data = buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    # the header goes out on its own, so an empty table is still valid CSV
+    writer.writerow(names)
+    yield flush()
+    for batch in batches:
+        writer.writerows(batch)
+        yield flush()
+
+
+def get_export_format(request):
+    export_format = request.args.get('format')
+    if export_format is None:
+        accept = request.accept_mimetypes.best_match(
+            [FORMATS['ndjson'], FORMATS['csv']], FORMATS['ndjson'])
+        export_format = 'csv' if accept == FORMATS['csv'] else 'ndjson'
+    if export_format not in FORMATS:
+        abort(400, {'message': 'format must be one of: {}'.format(
+            ', '.join(sorted(FORMATS)))})
+    return export_format
+
+
+def export_response(request, name):
+    export_format = get_export_format(request)
+    columns = EXPORTS[name]
+    names = [column.key.lower() for column in columns]
+
+    write = csv_chunks if export_format == 'csv' else ndjson_chunks
+    chunks = write(names, export_rows(columns))
+    return Response(stream_with_context(chunks),
+                    mimetype=FORMATS[export_format],
+                    headers={
+                        'Content-Disposition':
+                            'attachment; filename={}.{}'.format(
+                                name, export_format)
+                    })
@@ -0,0 +1,101 @@
+import operator
+from dateutil import parser as date_parser
+from flask import abort
+from models import row_columns, Actor, Movie
+
+"""
+Filter and Sort Whitelists
+
+Every query parameter maps to a column, a comparison and a parser for the
+raw value; sorting is only allowed on the listed (indexed) columns.
+"""
+
+
+def parse_date(value):
+    return date_parser.parse(value).date()
+
+
+FILTERS = {
+    Actor: {
+        'gender': (Actor.gender, operator.eq, str),
+        'age_min': (Actor.age, operator.ge, int),
+        'age_max': (Actor.age, operator.le, int)
+    },
+    Movie: {
+        'released_after': (Movie.release_date, operator.ge, parse_date),
+        'released_before': (Movie.release_date, operator.le, parse_date)
+    }
+}
+
+SORTS = {
+    Actor: {
+        'id': Actor.id,
+        'name': Actor.name,
+        'age': Actor.age
+    },
+    Movie: {
+        'id': Movie.id,
+        'title': Movie.title,
+        'release_date': Movie.release_date
+    }
+}
+
+"""
+Filter Functions
+"""
+
+
+def filter_query(request, model, query):
+    # returns the filtered query and a key of the applied filters, used to
+    # cache the COUNT(*) per filter combination
+    applied = []
+    for name, (column, compare, parse) in FILTERS[model].items():
+        raw = request.args.get(name)
+        if raw is None:
+            continue
+
+        try:
+            value = parse(raw)
+        except (ValueError, TypeError, OverflowError):
+            abort(400, {'message': 'Invalid value for {}'.format(name)})
+
+        query = query.filter(compare(column, value))
+        applied.append((name, value))
+
+    return query, tuple(applied)
+
+
+def get_sort(request, model):
+    # ?sort=-release_date,title -> [(column, descending), ...]
+    sorts = SORTS[model]
+    sort = []
+    for key in filter(None, request.args.get('sort', '').split(',')):
+        descending = key.startswith('-')
+        name = key.lstrip('-')
+        if name not in sorts:
+            abort(400, {
+                'message': 'sort must use: {}'.format(
+                    ', '.join(sorted(sorts)))})
+        sort.append((sorts[name], descending))
+
+    # the primary key breaks ties so pages and cursors are stable
+    if not any(column is model.id for column, _ in sort):
+        sort.append((model.id, False))
+    return sort
+
+
+def get_fields(request, model, param='fields'):
+    # ?fields=name,age -> columns to SELECT and return; id always comes first
+    raw = request.args.get(param)
+    if raw is None:
+        return row_columns(model)
+
+    names = ['id']
+    for name in filter(None, (name.strip() for name in raw.split(','))):
+        if name not in model.fields:
+            abort(400, {
+                'message': '{} must use: {}'.format(
+                    param, ', '.join(model.fields))})
+        if name not in names:
+            names.append(name)
+    return [getattr(model, name) for name in names]
@@ -0,0 +1,43 @@
+"""
+Gunicorn settings, picked up automatically from the working directory.
+
+    gunicorn 'app:create_app()'
+
+The app is built once in the master (preload_app) and shared with the
+workers copy-on-write. Each worker drops the inherited database
+connections right after the fork.
+"""
+import gc
+import os
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+# metrics of all workers are aggregated through this directory (see
+# metrics.py); it is emptied here, before the preloaded app writes to it,
+# so a restart does not add up the samples of the previous run
+multiproc_dir = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+if multiproc_dir:
+    os.makedirs(multiproc_dir, exist_ok=True)
+    for name in os.listdir(multiproc_dir):
+        if name.endswith('.db'):
+            os.remove(os.path.join(multiproc_dir, name))
+
+
+def when_ready(server):
+    # warm shared state before the first fork
+    from auth import jwks_store
+    jwks_store.refresh()
+
+    # keep the preloaded objects out of the collector so workers don't
+    # dirty (and copy) their pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from app import after_fork
+    after_fork(worker.app.wsgi())
+
+
+def child_exit(server, worker):
+    from metrics import worker_exit
+    worker_exit(worker.pid)
@@ -0,0 +1,169 @@
+import json
+import logging
+import time
+from contextlib import contextmanager
+from flask import g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from config import instrumentation as instrumentation_config
+
+logger = logging.getLogger(__name__)
+
+"""
+Instrumentation
+
+Per-request timings of the phases that matter: auth (with jwks fetches
+and jwt decodes inside it), every SQL statement (engine events),
+serialization and compression. They are sent back in a Server-Timing
+header and logged as one JSON line per request; requests over the query
+or latency budget are logged as warnings.
+
+Disabled (the default), init_instrumentation() hooks nothing in and
+phase() hands back a shared no-op context manager.
+"""
+
+ENABLED = instrumentation_config['enabled']
+SERVER_TIMING = instrumentation_config['server_timing']
+MAX_QUERIES = instrumentation_config['max_queries']
+MAX_MS = instrumentation_config['max_ms']
+
+
+class RequestTimings:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.queries = 0
+        self.slowest_query = (0.0, None)
+
+    def add(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def add_query(self, statement, seconds):
+        self.queries += 1
+        self.add('db', seconds)
+        if seconds > self.slowest_query[0]:
+            self.slowest_query = (seconds, statement)
+
+
+def current_timings():
+    # None outside a request, or when instrumentation is off
+    if not has_app_context():
+        return None
+    return g.get('timings')
+
+
+class _NoPhase:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NO_PHASE = _NoPhase()
+
+
+@contextmanager
+def _phase(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = current_timings()
+        if timings is not None:
+            timings.add(name, time.perf_counter() - started)
+
+
+def phase(name):
+    if not ENABLED:
+        return NO_PHASE
+    return _phase(name)
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context,
+                         executemany):
+    started = conn.info['query_started'].pop()
+    timings = current_timings()
+    if timings is not None:
+        timings.add_query(statement, time.perf_counter() - started)
+
+
+def handle_error(exception_context):
+    # a failed statement never reaches after_cursor_execute
+    started = exception_context.connection.info.get('query_started')
+    if started:
+        started.pop()
+
+
+SQL_EVENTS = {
+    'before_cursor_execute': before_cursor_execute,
+    'after_cursor_execute': after_cursor_execute,
+    'handle_error': handle_error
+}
+
+
+def start_timings():
+    g.timings = RequestTimings()
+
+
+def finish_timings(response):
+    timings = g.pop('timings', None)
+    if timings is None:
+        return response
+
+    total = time.perf_counter() - timings.started
+    phases = {name: round(seconds * 1000, 2)
+              for name, seconds in timings.phases.items()}
+
+    if SERVER_TIMING:
+        metrics = ['{};dur={}'.format(name, duration)
+                   for name, duration in phases.items()]
+        metrics.append('total;dur={};desc="{} queries"'.format(
+            round(total * 1000, 2), timings.queries))
+        response.headers['Server-Timing'] = ', '.join(metrics)
+
+    over_budget = []
+    if timings.queries > MAX_QUERIES:
+        over_budget.append('queries')
+    if total * 1000 > MAX_MS:
+        over_budget.append('latency')
+
+    record = {
+        'method': request.method,
+        'path': request.path,
+        'endpoint': request.endpoint,
+        'status': response.status_code,
+        'duration_ms': round(total * 1000, 2),
+        'queries': timings.queries,
+        'phases': phases
+    }
+    if over_budget:
+        record['over_budget'] = over_budget
+        seconds, statement = timings.slowest_query
+        if statement is not None:
+            record['slowest_query'] = {
+                'duration_ms': round(seconds * 1000, 2),
+                'statement': statement[:500]
+            }
+        logger.warning(json.dumps(record))
+    else:
+        logger.info(json.dumps(record))
+    return response
+
+
+def init_instrumentation(app):
+    # call before the other after_request hooks are registered, so that
+    # finish_timings() runs last and sees their work
+    if not ENABLED:
+        return
+    # on the Engine class, once per process whatever the number of apps
+    for name, listener in SQL_EVENTS.items():
+        if not event.contains(Engine, name, listener):
+            event.listen(Engine, name, listener)
+    app.before_request(start_timings)
+    app.after_request(finish_timings)
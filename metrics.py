@@ -0,0 +1,129 @@
+import time
+from flask import Response, g, request
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+from prometheus_client import generate_latest, multiprocess
+from auth import jwks_store, token_cache
+from config import metrics as metrics_config
+from models import pool_status
+
+"""
+Metrics
+
+Prometheus metrics on /metrics. Under gunicorn every worker writes its
+samples to PROMETHEUS_MULTIPROC_DIR (prometheus_client's multiprocess
+mode) and a scrape of any worker aggregates all of them. Pool gauges are
+refreshed at the end of every request and summed over the live workers.
+The JWKS and token caches keep plain counters of their own; those are
+copied into Prometheus counters after each request, so the hit ratios
+can be computed across workers with rate() in PromQL.
+"""
+
+MULTIPROC_DIR = metrics_config['multiproc_dir']
+
+REQUESTS = Counter(
+    'http_requests_total', 'HTTP requests',
+    ['endpoint', 'method', 'status'])
+LATENCY = Histogram(
+    'http_request_duration_seconds',
+    'Time spent until the response was ready to send',
+    ['endpoint', 'status'],
+    buckets=(.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10))
+ERRORS = Counter(
+    'http_errors_total', 'Responses with a 4xx/5xx status',
+    ['error', 'status'])
+DB_POOL = Gauge(
+    'db_pool_connections', 'Database pool counters, summed over workers',
+    ['state'], multiprocess_mode='livesum')
+TOKEN_CACHE_LOOKUPS = Counter(
+    'token_cache_lookups_total', 'Verified token cache lookups',
+    ['result'])
+JWKS_KEY_LOOKUPS = Counter(
+    'jwks_key_lookups_total', 'Signing key lookups by kid', ['result'])
+JWKS_FETCHES = Counter(
+    'jwks_fetches_total', 'JWKS downloads', ['result'])
+
+
+class StatsSync:
+    # adds what a stats() counter grew by since the last sync
+    def __init__(self, stats, counters):
+        self.stats = stats
+        self.counters = counters
+        self.seen = {}
+
+    def sync(self):
+        stats = self.stats()
+        for name, counter in self.counters.items():
+            delta = stats[name] - self.seen.get(name, 0)
+            if delta > 0:
+                counter.inc(delta)
+                self.seen[name] = stats[name]
+
+
+cache_stats = [
+    StatsSync(token_cache.stats, {
+        'hits': TOKEN_CACHE_LOOKUPS.labels('hit'),
+        'misses': TOKEN_CACHE_LOOKUPS.labels('miss')
+    }),
+    StatsSync(jwks_store.stats, {
+        'hits': JWKS_KEY_LOOKUPS.labels('hit'),
+        'misses': JWKS_KEY_LOOKUPS.labels('miss'),
+        'fetches': JWKS_FETCHES.labels('total'),
+        'fetch_errors': JWKS_FETCHES.labels('error')
+    })
+]
+
+
+def mark_error(error):
+    # names the error of this request for http_errors_total
+    g.metrics_error = error
+
+
+def start_request():
+    g.metrics_started = time.perf_counter()
+
+
+def record_request(response):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return response
+
+    endpoint = request.endpoint or 'none'
+    status = str(response.status_code)
+    REQUESTS.labels(endpoint, request.method, status).inc()
+    LATENCY.labels(endpoint, status).observe(time.perf_counter() - started)
+    if response.status_code >= 400:
+        default = 'ServerError' if response.status_code >= 500 \
+            else 'HTTPException'
+        ERRORS.labels(g.pop('metrics_error', default), status).inc()
+
+    for name, value in pool_status().items():
+        if name != 'class':
+            DB_POOL.labels(name).set(value)
+    for stats in cache_stats:
+        stats.sync()
+    return response
+
+
+def metrics_view():
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, path=MULTIPROC_DIR)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry),
+                    content_type=CONTENT_TYPE_LATEST)
+
+
+def init_metrics(app):
+    if not app.config['METRICS_ENABLED']:
+        return
+    app.before_request(start_request)
+    app.after_request(record_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+
+
+def worker_exit(pid):
+    # drops the live gauges of a worker that is gone
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid, MULTIPROC_DIR)
@@ -26,6 +26,7 @@ config.set_main_option(
     'sqlalchemy.url',
     str(current_app.extensions['migrate'].db.engine.url).replace('%', '%%'))
 target_metadata = current_app.extensions['migrate'].db.metadata
+from models import SEARCH_INDEXES
 
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
@@ -72,6 +73,10 @@ def run_migrations_online():
                 directives[:] = []
                 logger.info('No changes in schema detected.')
 
+    # the search GIN indexes are managed by hand, see models.SEARCH_INDEXES
+    def include_object(object, name, type_, reflected, compare_to):
+        return not (type_ == 'index' and name in SEARCH_INDEXES)
+
     connectable = engine_from_config(
         config.get_section(config.config_ini_section),
         prefix='sqlalchemy.',
@@ -83,6 +88,7 @@ def run_migrations_online():
             connection=connection,
             target_metadata=target_metadata,
             process_revision_directives=process_revision_directives,
+            include_object=include_object,
             **current_app.extensions['migrate'].configure_args
         )
 
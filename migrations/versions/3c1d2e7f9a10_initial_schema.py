@@ -0,0 +1,52 @@
+"""initial schema
+
+Revision ID: 3c1d2e7f9a10
+Revises:
+Create Date: 2026-10-18 09:00:00.000000
+
+The tables as db.create_all() used to create them on every start.
+Databases created that way already have them; mark them with
+`python manage.py db stamp 3c1d2e7f9a10` before upgrading.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c1d2e7f9a10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'movies',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(), nullable=True),
+        sa.Column('release_date', sa.Date(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'actors',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=True),
+        sa.Column('gender', sa.String(), nullable=True),
+        sa.Column('age', sa.Integer(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'Performance',
+        sa.Column('Movie_id', sa.Integer(), nullable=True),
+        sa.Column('Actor_id', sa.Integer(), nullable=True),
+        sa.Column('actor_fee', sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(['Actor_id'], ['actors.id'], ),
+        sa.ForeignKeyConstraint(['Movie_id'], ['movies.id'], )
+    )
+
+
+def downgrade():
+    op.drop_table('Performance')
+    op.drop_table('actors')
+    op.drop_table('movies')
@@ -0,0 +1,86 @@
+"""performance primary key and lookup indexes
+
+Revision ID: 8b4f6a2c5d31
+Revises: 3c1d2e7f9a10
+Create Date: 2026-10-18 09:30:00.000000
+
+Adds a composite primary key on Performance (Movie_id, Actor_id), an index
+for the reverse (Actor_id, Movie_id) direction and indexes on
+movies.release_date, movies.title and actors.name. Cast rows without ids
+and duplicate (movie, actor) pairs are removed first, as the primary key
+would reject them.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b4f6a2c5d31'
+down_revision = '3c1d2e7f9a10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    op.execute(
+        'DELETE FROM "Performance" '
+        'WHERE "Movie_id" IS NULL OR "Actor_id" IS NULL')
+
+    # keep one row of every duplicated (movie, actor) pair; Postgres has
+    # no MIN(ctid) before 14, so it compares the rows pairwise instead
+    if bind.dialect.name == 'postgresql':
+        op.execute(
+            'DELETE FROM "Performance" a USING "Performance" b '
+            'WHERE a.ctid > b.ctid '
+            'AND a."Movie_id" = b."Movie_id" '
+            'AND a."Actor_id" = b."Actor_id"')
+    else:
+        op.execute(
+            'DELETE FROM "Performance" WHERE rowid NOT IN ('
+            'SELECT MIN(rowid) FROM "Performance" '
+            'GROUP BY "Movie_id", "Actor_id")')
+
+    with op.batch_alter_table('Performance') as batch_op:
+        batch_op.alter_column('Movie_id', existing_type=sa.Integer(),
+                              nullable=False)
+        batch_op.alter_column('Actor_id', existing_type=sa.Integer(),
+                              nullable=False)
+        batch_op.create_primary_key(
+            'Performance_pkey', ['Movie_id', 'Actor_id'])
+
+    op.create_index('ix_Performance_Actor_id_Movie_id', 'Performance',
+                    ['Actor_id', 'Movie_id'], unique=False)
+    op.create_index('ix_movies_release_date', 'movies', ['release_date'],
+                    unique=False)
+    op.create_index('ix_movies_title', 'movies', ['title'], unique=False)
+    op.create_index('ix_actors_name', 'actors', ['name'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_actors_name', table_name='actors')
+    op.drop_index('ix_movies_title', table_name='movies')
+    op.drop_index('ix_movies_release_date', table_name='movies')
+    op.drop_index('ix_Performance_Actor_id_Movie_id',
+                  table_name='Performance')
+
+    if op.get_bind().dialect.name != 'postgresql':
+        # sqlite cannot reflect the constraint name, rebuild the table as it
+        # was before this revision
+        performance = sa.Table(
+            'Performance', sa.MetaData(),
+            sa.Column('Movie_id', sa.Integer(), sa.ForeignKey('movies.id')),
+            sa.Column('Actor_id', sa.Integer(), sa.ForeignKey('actors.id')),
+            sa.Column('actor_fee', sa.Float()))
+        with op.batch_alter_table('Performance', copy_from=performance,
+                                  recreate='always'):
+            pass
+        return
+
+    op.drop_constraint('Performance_pkey', 'Performance', type_='primary')
+    op.alter_column('Performance', 'Actor_id', existing_type=sa.Integer(),
+                    nullable=True)
+    op.alter_column('Performance', 'Movie_id', existing_type=sa.Integer(),
+                    nullable=True)
@@ -0,0 +1,29 @@
+"""actor filter indexes
+
+Revision ID: c2a9d4e6f813
+Revises: 8b4f6a2c5d31
+Create Date: 2026-10-18 11:00:00.000000
+
+Indexes behind the ?gender= and ?age_min=/?age_max= filters of /actors.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2a9d4e6f813'
+down_revision = '8b4f6a2c5d31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_actors_gender_age', 'actors', ['gender', 'age'],
+                    unique=False)
+    op.create_index('ix_actors_age', 'actors', ['age'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_actors_age', table_name='actors')
+    op.drop_index('ix_actors_gender_age', table_name='actors')
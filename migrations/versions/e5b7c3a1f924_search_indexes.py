@@ -0,0 +1,52 @@
+"""search indexes
+
+Revision ID: e5b7c3a1f924
+Revises: c2a9d4e6f813
+Create Date: 2026-10-18 12:00:00.000000
+
+pg_trgm plus GIN indexes for /search: a 'simple' tsvector for prefix
+matches and trigrams for typo tolerant similarity, on actors.name and
+movies.title. Postgres only.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b7c3a1f924'
+down_revision = 'c2a9d4e6f813'
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    'ix_actors_name_tsv':
+        "CREATE INDEX ix_actors_name_tsv ON actors "
+        "USING gin (to_tsvector('simple'::regconfig, name))",
+    'ix_actors_name_trgm':
+        "CREATE INDEX ix_actors_name_trgm ON actors "
+        "USING gin (name gin_trgm_ops)",
+    'ix_movies_title_tsv':
+        "CREATE INDEX ix_movies_title_tsv ON movies "
+        "USING gin (to_tsvector('simple'::regconfig, title))",
+    'ix_movies_title_trgm':
+        "CREATE INDEX ix_movies_title_trgm ON movies "
+        "USING gin (title gin_trgm_ops)"
+}
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for statement in INDEXES.values():
+        op.execute(statement)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for name in INDEXES:
+        op.execute('DROP INDEX IF EXISTS {}'.format(name))
@@ -0,0 +1,50 @@
+"""table versions and updated_at
+
+Revision ID: f1a6d8b2c047
+Revises: e5b7c3a1f924
+Create Date: 2026-10-18 13:00:00.000000
+
+updated_at on actors and movies for If-Match, and a table_versions row
+per table for ETag / If-None-Match on the list endpoints.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1a6d8b2c047'
+down_revision = 'e5b7c3a1f924'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    table_versions = op.create_table(
+        'table_versions',
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('name')
+    )
+    op.bulk_insert(table_versions, [
+        {'name': 'actors', 'version': 1},
+        {'name': 'movies', 'version': 1},
+    ])
+    # added nullable and backfilled, sqlite cannot ADD COLUMN with a
+    # non-constant default
+    for table in ('actors', 'movies'):
+        op.add_column(table, sa.Column(
+            'updated_at', sa.DateTime(), nullable=True))
+        op.execute(sa.table(table, sa.column('updated_at'))
+                   .update().values(updated_at=sa.func.now()))
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('updated_at', existing_type=sa.DateTime(),
+                                  nullable=False)
+
+
+def downgrade():
+    for table in ('movies', 'actors'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('updated_at')
+    op.drop_table('table_versions')
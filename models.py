@@ -1,9 +1,12 @@
 import os
-from sqlalchemy import Column, Integer, String, Float, Date, create_engine
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime
+from sqlalchemy import create_engine
+from sqlalchemy import DDL, event
+from sqlalchemy.pool import NullPool
 import json
 from flask_sqlalchemy import SQLAlchemy
-from config import database_setup
-# from datetime import Date
+from config import database_setup, database_pool
+from datetime import date, datetime
 
 
 """
@@ -23,20 +26,222 @@ database_path = os.environ.get('DATABASE_URL',
 
 db = SQLAlchemy()
 
+STARTUP_MODES = ('production', 'dev', 'test')
+
+
+def engine_options(database_path, pool_config=database_pool):
+    # sqlite (tests) keeps the driver defaults
+    if database_path.startswith('sqlite'):
+        return {}
+
+    if pool_config['external_pooler']:
+        # PgBouncer rejects the options startup parameter, the timeout is
+        # set by set_statement_timeout() instead
+        return {'poolclass': NullPool}
+
+    options = {}
+    if database_path.startswith('postgres') and \
+            pool_config['statement_timeout']:
+        options['connect_args'] = {
+            'options': '-c statement_timeout={}'.format(
+                pool_config['statement_timeout'])
+        }
+
+    pool_size = pool_config['pool_size']
+    max_overflow = pool_config['max_overflow']
+    if pool_config['max_connections']:
+        per_worker = max(
+            pool_config['max_connections'] // max(pool_config['workers'], 1),
+            1)
+        pool_size = min(pool_size, per_worker)
+        max_overflow = min(max_overflow, per_worker - pool_size)
+
+    options.update({
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_timeout': pool_config['pool_timeout'],
+        'pool_recycle': pool_config['pool_recycle'],
+        'pool_pre_ping': pool_config['pool_pre_ping']
+    })
+    return options
+
 
 def setup_db(app, database_path=database_path):
     # connecting Flask Web App and SQLAlchemy
     app.config["SQLALCHEMY_DATABASE_URI"] = database_path
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config.setdefault(
+        "SQLALCHEMY_ENGINE_OPTIONS", engine_options(database_path))
     db.app = app
     db.init_app(app)
-    db.create_all()
+
+    if database_path.startswith('postgres') and \
+            database_pool['external_pooler'] and \
+            database_pool['statement_timeout']:
+        event.listen(db.get_engine(app), 'connect', set_statement_timeout)
+
+
+def set_statement_timeout(dbapi_connection, connection_record):
+    # a plain SET once per new connection, which PgBouncer passes through
+    cursor = dbapi_connection.cursor()
+    cursor.execute('SET statement_timeout = {:d}'.format(
+        database_pool['statement_timeout']))
+    cursor.close()
+    dbapi_connection.commit()
+
+
+def bulk_insert(model, rows, batch_size=1000):
+    # multi-row INSERT ... RETURNING id per batch, in the caller's
+    # transaction; ids come back in the order of rows
+    table = model.__table__
+    bump_version(table.name)
+    ids = []
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        if db.engine.dialect.implicit_returning:
+            result = db.session.execute(
+                table.insert().values(batch).returning(table.c.id))
+            ids.extend(row[0] for row in result)
+        else:
+            for row in batch:
+                result = db.session.execute(table.insert().values(row))
+                ids.append(result.inserted_primary_key[0])
+    return ids
+
+
+def bulk_update(model, ids, values):
+    # one UPDATE ... WHERE id IN (...) RETURNING id, returns matched ids
+    table = model.__table__
+    bump_version(table.name)
+    statement = table.update().where(table.c.id.in_(ids)).values(values)
+    if db.engine.dialect.implicit_returning:
+        result = db.session.execute(statement.returning(table.c.id))
+        return [row[0] for row in result]
+
+    found = [row[0] for row in db.session.execute(
+        db.select([table.c.id]).where(table.c.id.in_(ids)))]
+    db.session.execute(statement)
+    return found
+
+
+def bulk_delete(model, ids):
+    # cast rows go first, then one DELETE ... RETURNING id
+    table = model.__table__
+    bump_version(table.name)
+    link = Performance.c.Actor_id if model is Actor else Performance.c.Movie_id
+    db.session.execute(Performance.delete().where(link.in_(ids)))
+
+    statement = table.delete().where(table.c.id.in_(ids))
+    if db.engine.dialect.implicit_returning:
+        result = db.session.execute(statement.returning(table.c.id))
+        return [row[0] for row in result]
+
+    found = [row[0] for row in db.session.execute(
+        db.select([table.c.id]).where(table.c.id.in_(ids)))]
+    db.session.execute(statement)
+    return found
+
+
+def bump_version(table_name):
+    # runs in the caller's transaction, so the version moves with the data
+    table = TableVersion.__table__
+    now = datetime.utcnow()
+    result = db.session.execute(
+        table.update()
+        .where(table.c.name == table_name)
+        .values(version=table.c.version + 1, updated_at=now))
+    if result.rowcount == 0:
+        db.session.execute(table.insert().values(
+            name=table_name, version=1, updated_at=now))
+
+
+def table_versions(table_names):
+    # {name: (version, updated_at)}, one primary key lookup per request
+    rows = db.session.query(
+        TableVersion.name, TableVersion.version, TableVersion.updated_at) \
+        .filter(TableVersion.name.in_(table_names))
+    versions = {name: (0, None) for name in table_names}
+    versions.update((name, (version, updated_at))
+                    for name, version, updated_at in rows)
+    return versions
+
+
+def row_columns(model):
+    # the columns format() returns, for queries that skip ORM objects
+    return [getattr(model, name) for name in model.fields]
+
+
+def rows_to_dicts(columns, rows):
+    names = [column.key for column in columns]
+    return [dict(zip(names, row)) for row in rows]
+
+
+def cast_for_movies(movie_ids, columns=None):
+    # one IN query for any number of movies: {movie_id: [actor + fee]}
+    cast = {movie_id: [] for movie_id in movie_ids}
+    if not movie_ids:
+        return cast
+
+    columns = columns or row_columns(Actor)
+    rows = db.session.query(
+        Performance.c.Movie_id, Performance.c.actor_fee, *columns) \
+        .join(Actor, Actor.id == Performance.c.Actor_id) \
+        .filter(Performance.c.Movie_id.in_(movie_ids)) \
+        .order_by(Performance.c.Movie_id, Actor.id)
+
+    names = [column.key for column in columns]
+    for movie_id, fee, *actor in rows:
+        cast[movie_id].append(dict(zip(names, actor), actor_fee=fee))
+    return cast
+
+
+def filmography_for_actors(actor_ids, columns=None):
+    # one IN query for any number of actors: {actor_id: [movie + fee]}
+    filmography = {actor_id: [] for actor_id in actor_ids}
+    if not actor_ids:
+        return filmography
+
+    columns = columns or row_columns(Movie)
+    rows = db.session.query(
+        Performance.c.Actor_id, Performance.c.actor_fee, *columns) \
+        .join(Movie, Movie.id == Performance.c.Movie_id) \
+        .filter(Performance.c.Actor_id.in_(actor_ids)) \
+        .order_by(Performance.c.Actor_id, Movie.id)
+
+    names = [column.key for column in columns]
+    for actor_id, fee, *movie in rows:
+        filmography[actor_id].append(dict(zip(names, movie), actor_fee=fee))
+    return filmography
+
+
+def pool_status():
+    # NullPool and the sqlite pools do not keep all of these counters
+    pool = db.engine.pool
+    status = {'class': type(pool).__name__}
+    for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+        counter = getattr(pool, name, None)
+        if counter is not None:
+            status[name] = counter()
+    return status
+
+
+def init_schema(mode):
+    # schema work happens only when asked for, never on a production boot
+    if mode not in STARTUP_MODES:
+        raise ValueError('Unknown startup mode {}'.format(mode))
+
+    if mode == 'test':
+        db_drop_and_create_all()
+    elif mode == 'dev':
+        db.create_all()
+        if Actor.query.first() is None:
+            db_init_records()
 
 
 def db_drop_and_create_all():
-    db.drop_all
-    db.create_all
-    db_init_records
+    db.drop_all()
+    db.create_all()
+    db_init_records()
 
 
 def db_init_records():
@@ -50,17 +255,17 @@ def db_init_records():
 
     new_movie = (Movie(
         title='Six Pack Coder',
-        release_date=Date.today()
+        release_date=date.today()
     ))
 
+    new_actor.insert()
+    new_movie.insert()
+
     new_performance = Performance.insert().values(
         Movie_id=new_movie.id,
         Actor_id=new_actor.id,
         actor_fee=1000.00
     )
-
-    new_actor.insert()
-    new_movie.insert()
     db.session.execute(new_performance)
     db.session.commit()
 
@@ -69,11 +274,16 @@ def db_init_records():
 Relation/Association
 """
 
+# (Movie_id, Actor_id) is the primary key, the extra index serves lookups
+# from the actor side; keep in sync with migrations/versions
 Performance = db.Table(
     'Performance', db.Model.metadata, db.Column(
         'Movie_id', db.Integer, db.ForeignKey('movies.id')), db.Column(
             'Actor_id', db.Integer, db.ForeignKey('actors.id')), db.Column(
-                'actor_fee', db.Float))
+                'actor_fee', db.Float),
+    db.PrimaryKeyConstraint(
+        'Movie_id', 'Actor_id', name='Performance_pkey'),
+    db.Index('ix_Performance_Actor_id_Movie_id', 'Actor_id', 'Movie_id'))
 
 
 """
@@ -85,14 +295,19 @@ class Movie(db.Model):
     __tablename__ = 'movies'
 
     id = Column(Integer, primary_key=True)
-    title = Column(String)
-    release_date = Column(Date)
+    title = Column(String, index=True)
+    release_date = Column(Date, index=True)
+    updated_at = Column(DateTime, nullable=False,
+                        default=datetime.utcnow, onupdate=datetime.utcnow)
+    # lazy on both sides, queries that need the relation ask for it with
+    # selectinload()/joinedload() options
     actors = db.relationship(
         'Actor',
         secondary=Performance,
+        lazy='select',
         backref=db.backref(
             'performances',
-            lazy='joined'))
+            lazy='select'))
 
     def __init__(self, title, release_date):
         self.title = title
@@ -100,15 +315,20 @@ class Movie(db.Model):
 
     def insert(self):
         db.session.add(self)
+        bump_version(self.__tablename__)
         db.session.commit()
 
     def update(self):
+        bump_version(self.__tablename__)
         db.session.commit()
 
     def delete(self):
         db.session.delete(self)
+        bump_version(self.__tablename__)
         db.session.commit()
 
+    fields = ('id', 'title', 'release_date')
+
     def format(self):
         return {
             'id': self.id,
@@ -124,11 +344,16 @@ Actors Model
 
 class Actor(db.Model):
     __tablename__ = 'actors'
+    __table_args__ = (
+        db.Index('ix_actors_gender_age', 'gender', 'age'),
+    )
 
     id = Column(Integer, primary_key=True)
-    name = Column(String)
+    name = Column(String, index=True)
     gender = Column(String)
-    age = Column(Integer)
+    age = Column(Integer, index=True)
+    updated_at = Column(DateTime, nullable=False,
+                        default=datetime.utcnow, onupdate=datetime.utcnow)
 
     def __init__(self, name, gender, age):
         self.name = name
@@ -137,12 +362,20 @@ class Actor(db.Model):
 
     def insert(self):
         db.session.add(self)
+        bump_version(self.__tablename__)
         db.session.commit()
 
     def update(self):
+        bump_version(self.__tablename__)
+        db.session.commit()
+
+    def delete(self):
         db.session.delete(self)
+        bump_version(self.__tablename__)
         db.session.commit()
 
+    fields = ('id', 'name', 'gender', 'age')
+
     def format(self):
         return {
             'id': self.id,
@@ -150,3 +383,54 @@ class Actor(db.Model):
             'gender': self.gender,
             'age': self.age
         }
+
+
+"""
+Table Versions
+
+One row per table, bumped in the same transaction as every write made
+through the models. Conditional GETs compare these instead of the data.
+"""
+
+
+class TableVersion(db.Model):
+    __tablename__ = 'table_versions'
+
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime)
+
+
+"""
+Search Indexes
+
+GIN indexes for search.py, Postgres only so sqlite test databases can
+still be created. They are left out of autogenerate (migrations/env.py)
+because the expressions do not round-trip through reflection.
+"""
+
+SEARCH_INDEXES = {
+    'ix_actors_name_tsv':
+        "CREATE INDEX IF NOT EXISTS ix_actors_name_tsv ON actors "
+        "USING gin (to_tsvector('simple'::regconfig, name))",
+    'ix_actors_name_trgm':
+        "CREATE INDEX IF NOT EXISTS ix_actors_name_trgm ON actors "
+        "USING gin (name gin_trgm_ops)",
+    'ix_movies_title_tsv':
+        "CREATE INDEX IF NOT EXISTS ix_movies_title_tsv ON movies "
+        "USING gin (to_tsvector('simple'::regconfig, title))",
+    'ix_movies_title_trgm':
+        "CREATE INDEX IF NOT EXISTS ix_movies_title_trgm ON movies "
+        "USING gin (title gin_trgm_ops)"
+}
+
+event.listen(
+    db.Model.metadata, 'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    .execute_if(dialect='postgresql'))
+
+for _name, _statement in SEARCH_INDEXES.items():
+    event.listen(
+        Actor.__table__ if _name.startswith('ix_actors') else Movie.__table__,
+        'after_create',
+        DDL(_statement).execute_if(dialect='postgresql'))
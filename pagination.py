@@ -0,0 +1,238 @@
+import base64
+import binascii
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from flask import abort
+from sqlalchemy import and_, or_, nullsfirst, nullslast
+from cache import current_versions
+from config import pagination
+from models import row_columns, rows_to_dicts
+
+"""
+Pagination Config
+"""
+
+ROWS_PER_PAGE = pagination['per_page']
+MAX_ROWS_PER_PAGE = pagination['max_per_page']
+COUNT_CACHE_TTL = pagination['count_cache_ttl']
+COUNT_CACHE_SIZE = pagination['count_cache_size']
+
+"""
+COUNT cache
+
+Totals are cached per table so paging through a large table only pays
+for the COUNT(*) once every COUNT_CACHE_TTL seconds. Keys carry the
+table's shared version, so a write in any worker retires the cached
+total; invalidate_count() only frees the local entries early.
+Keys include the client's filter values, so the cache is an LRU bounded
+by COUNT_CACHE_SIZE; expired entries are dropped before live ones.
+"""
+
+_count_cache = OrderedDict()
+_count_lock = threading.Lock()
+
+
+def cached_count(key, query):
+    now = time.monotonic()
+    with _count_lock:
+        entry = _count_cache.get(key)
+        if entry is not None and entry[1] > now:
+            _count_cache.move_to_end(key)
+            return entry[0]
+        if entry is not None:
+            del _count_cache[key]
+
+    total = query.order_by(None).count()
+    with _count_lock:
+        if len(_count_cache) >= COUNT_CACHE_SIZE:
+            for expired in [k for k, (_, expires_at) in _count_cache.items()
+                            if expires_at <= now]:
+                del _count_cache[expired]
+        _count_cache[key] = (total, now + COUNT_CACHE_TTL)
+        _count_cache.move_to_end(key)
+        while len(_count_cache) > COUNT_CACHE_SIZE:
+            _count_cache.popitem(last=False)
+    return total
+
+
+def invalidate_count(table_name=None):
+    with _count_lock:
+        if table_name is None:
+            _count_cache.clear()
+            return
+        for key in list(_count_cache):
+            if key[0] == table_name:
+                del _count_cache[key]
+
+
+"""
+Pagination Functions
+"""
+
+
+def get_page_args(request):
+    # get from page or default page which is 1
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', ROWS_PER_PAGE, type=int)
+
+    if page < 1:
+        abort(400, {'message': 'page must be a positive integer'})
+
+    if per_page < 1:
+        abort(400, {'message': 'per_page must be a positive integer'})
+
+    return page, min(per_page, MAX_ROWS_PER_PAGE)
+
+
+def order_clauses(sort):
+    # NULL sorts as the largest value (ASC NULLS LAST, DESC NULLS FIRST),
+    # the order of a plain Postgres btree index scanned either way; the
+    # seek predicate relies on it. NOT NULL columns like the primary key
+    # get no NULLS clause at all.
+    clauses = []
+    for column, descending in sort:
+        clause = column.desc() if descending else column.asc()
+        if column.nullable:
+            clause = nullsfirst(clause) if descending else nullslast(clause)
+        clauses.append(clause)
+    return clauses
+
+
+def sort_signature(sort):
+    return ','.join(('-' if descending else '') + column.key
+                    for column, descending in sort)
+
+
+"""
+Cursor Functions
+
+Cursors are opaque to clients: url-safe base64 of the JSON encoded
+sort and seek key (sort columns then id) of the last row on the page.
+"""
+
+
+def encode_cursor(sort, values):
+    raw = json.dumps({
+        's': sort_signature(sort),
+        'k': [value.isoformat() if isinstance(value, date) else value
+              for value in values]
+    }, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def cursor_value(column, value):
+    if value is None:
+        return None
+
+    python_type = column.type.python_type
+    if python_type is date:
+        return date.fromisoformat(value)
+    if not isinstance(value, python_type):
+        raise ValueError('cursor value does not match the column')
+    return value
+
+
+def decode_cursor(cursor, sort):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = data['k']
+        # a cursor only continues the sort it was issued for
+        if data['s'] != sort_signature(sort) or len(values) != len(sort):
+            raise ValueError('cursor does not match the sort')
+        return [cursor_value(column, value)
+                for (column, _), value in zip(sort, values)]
+    except (binascii.Error, ValueError, UnicodeDecodeError,
+            TypeError, KeyError):
+        abort(400, {'message': 'Invalid cursor'})
+
+
+def seek_filter(sort, values):
+    # rows strictly after `values` in the order_clauses() order:
+    # k1 after v1 OR (k1 = v1 AND k2 after v2) OR ...
+    # A NOT NULL key compiles to a bare range condition the index can use;
+    # the NULLs of a nullable key get their own branch.
+    conditions = []
+    equal = []
+    for (column, descending), value in zip(sort, values):
+        if value is None:
+            # NULL is the largest value: first when descending, else last
+            after = column.isnot(None) if descending else None
+            same = column.is_(None)
+        elif descending:
+            after = column < value
+            same = column == value
+        else:
+            after = column > value
+            if column.nullable:
+                after = or_(after, column.is_(None))
+            same = column == value
+
+        if after is not None:
+            conditions.append(and_(*(equal + [after])))
+        equal.append(same)
+
+    return or_(*conditions)
+
+
+def selected_columns(columns, sort):
+    # the sort keys ride along after the requested columns, the cursor
+    # needs them; rows_to_dicts() only returns the requested ones
+    keys = {column.key for column in columns}
+    return columns + [column for column, _ in sort if column.key not in keys]
+
+
+def seek_query(request, query, model, sort, columns=None):
+    _, per_page = get_page_args(request)
+    after = request.args.get('after', '')
+
+    if after:
+        query = query.filter(seek_filter(sort, decode_cursor(after, sort)))
+
+    # one extra row tells us whether there is a next page
+    columns = columns or row_columns(model)
+    items = query.with_entities(*selected_columns(columns, sort)) \
+        .order_by(*order_clauses(sort)).limit(per_page + 1).all()
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        next_cursor = encode_cursor(
+            sort, [getattr(items[-1], column.key) for column, _ in sort])
+
+    return rows_to_dicts(columns, items), {
+        'per_page': per_page,
+        'next_cursor': next_cursor
+    }
+
+
+def paginate_query(request, query, model, sort=None, count_key=(),
+                   columns=None):
+    # sort is a list of (column, descending) ending with the primary key
+    sort = sort or [(model.id, False)]
+
+    # ?after= switches to keyset pagination, ?page= stays the default
+    if 'after' in request.args:
+        return seek_query(request, query, model, sort, columns)
+
+    page, per_page = get_page_args(request)
+
+    # LIMIT/OFFSET in SQL with a stable order, column tuples only
+    columns = columns or row_columns(model)
+    items = query.with_entities(*columns) \
+        .order_by(*order_clauses(sort)) \
+        .limit(per_page) \
+        .offset((page - 1) * per_page) \
+        .all()
+
+    table = model.__tablename__
+    version = current_versions([table])[table][0]
+    total = cached_count((table, version) + count_key, query)
+
+    return rows_to_dicts(columns, items), {
+        'total': total,
+        'page': page,
+        'per_page': per_page
+    }
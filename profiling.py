@@ -0,0 +1,72 @@
+import glob
+import hmac
+import os
+import random
+from werkzeug.middleware.profiler import ProfilerMiddleware
+
+"""
+Profiling
+
+Opt-in cProfile of production requests: a PROFILE_SAMPLE_RATE share of
+them, plus any request whose X-Profile header carries PROFILE_SECRET.
+Each profiled request leaves a pstats file in PROFILE_DIR (newest
+PROFILE_MAX_FILES kept), e.g. for `snakeviz` or `flameprof`. With neither
+a rate nor a secret configured the app is not wrapped at all.
+"""
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+
+
+class SamplingProfiler:
+    def __init__(self, wsgi_app, directory, sample_rate=0.0, secret='',
+                 max_files=200):
+        self.wsgi_app = wsgi_app
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.secret = secret.encode()
+        self.max_files = max_files
+
+        os.makedirs(directory, exist_ok=True)
+        self.profiled_app = ProfilerMiddleware(
+            wsgi_app, stream=None, profile_dir=directory,
+            filename_format='{time:.6f}.{method}.{path}.{elapsed:.0f}ms.prof')
+
+    def wants_profile(self, environ):
+        secret = environ.get(PROFILE_HEADER)
+        if self.secret and secret is not None:
+            return hmac.compare_digest(secret.encode(), self.secret)
+        return random.random() < self.sample_rate
+
+    def rotate(self):
+        # every worker rotates, so a file may already be gone
+        files = []
+        for path in glob.glob(os.path.join(self.directory, '*.prof')):
+            try:
+                files.append((os.path.getmtime(path), path))
+            except FileNotFoundError:
+                pass
+        files.sort()
+        for _, path in files[:-self.max_files or None]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def __call__(self, environ, start_response):
+        if not self.wants_profile(environ):
+            return self.wsgi_app(environ, start_response)
+
+        # the profiled response is buffered, streams included
+        response = self.profiled_app(environ, start_response)
+        self.rotate()
+        return response
+
+
+def init_profiling(app):
+    sample_rate = app.config['PROFILE_SAMPLE_RATE']
+    secret = app.config['PROFILE_SECRET']
+    if sample_rate <= 0 and not secret:
+        return
+    app.wsgi_app = SamplingProfiler(
+        app.wsgi_app, app.config['PROFILE_DIR'], sample_rate, secret,
+        app.config['PROFILE_MAX_FILES'])
@@ -0,0 +1,170 @@
+import bisect
+import re
+import threading
+from flask import abort
+from sqlalchemy import func, literal_column
+from models import db, row_columns, rows_to_dicts, Actor, Movie
+from pagination import get_page_args
+
+"""
+Search Config
+
+Postgres matches prefixes through a 'simple' tsvector and tolerates typos
+through pg_trgm similarity, both served by the GIN indexes declared in
+models.py. Other databases (sqlite in tests) fall back to an in-memory
+prefix index that is rebuilt after writes.
+"""
+
+SEARCH_COLUMNS = {
+    Actor: Actor.name,
+    Movie: Movie.title
+}
+
+TS_CONFIG = literal_column("'simple'::regconfig")
+
+
+def get_terms(request):
+    q = request.args.get('q', '')
+    terms = re.findall(r'\w+', q.lower())
+    if not terms:
+        abort(400, {'message': 'q must contain at least one word'})
+
+    if 'sort' in request.args or 'after' in request.args:
+        abort(400, {
+            'message': 'Search results are ranked, use ?page= without sort'})
+
+    return q, terms
+
+
+"""
+Postgres Engine
+"""
+
+
+def postgres_search(model, query, q, terms, page, per_page, filtered):
+    column = SEARCH_COLUMNS[model]
+    tsvector = func.to_tsvector(TS_CONFIG, column)
+    tsquery = func.to_tsquery(
+        TS_CONFIG, ' & '.join(term + ':*' for term in terms))
+
+    # pg_trgm's similarity operator, escaped for pyformat drivers (psycopg2)
+    similar = '%%' if db.engine.dialect.paramstyle in (
+        'format', 'pyformat') else '%'
+
+    matches = query.filter(
+        tsvector.op('@@')(tsquery) | column.op(similar)(q))
+    rank = func.ts_rank(tsvector, tsquery) + func.similarity(column, q)
+
+    items = matches.order_by(rank.desc(), model.id) \
+        .limit(per_page) \
+        .offset((page - 1) * per_page) \
+        .all()
+
+    return items, matches.order_by(None).count()
+
+
+"""
+Prefix Index Engine
+"""
+
+
+class PrefixIndex:
+    def __init__(self, rows):
+        # sorted (token, id) pairs, a prefix is a contiguous range
+        self.lengths = {}
+        self.tokens = []
+        for row_id, text in rows:
+            text = (text or '').lower()
+            self.lengths[row_id] = len(text)
+            self.tokens.extend(
+                (token, row_id) for token in set(re.findall(r'\w+', text)))
+        self.tokens.sort()
+
+    def lookup(self, term):
+        # {id: 2 for an exact token, 1 for a prefix}
+        scores = {}
+        start = bisect.bisect_left(self.tokens, (term,))
+        for token, row_id in self.tokens[start:]:
+            if not token.startswith(term):
+                break
+            scores[row_id] = max(scores.get(row_id, 0),
+                                 2 if token == term else 1)
+        return scores
+
+    def search(self, terms):
+        # every term has to match; best scores, then shortest texts first
+        scores = None
+        for term in terms:
+            found = self.lookup(term)
+            if scores is None:
+                scores = found
+            else:
+                scores = {row_id: scores[row_id] + score
+                          for row_id, score in found.items()
+                          if row_id in scores}
+
+        return sorted(scores, key=lambda row_id: (
+            -scores[row_id], self.lengths[row_id], row_id))
+
+
+_prefix_indexes = {}
+_prefix_lock = threading.Lock()
+
+
+def get_prefix_index(model):
+    index = _prefix_indexes.get(model.__tablename__)
+    if index is None:
+        column = SEARCH_COLUMNS[model]
+        with _prefix_lock:
+            index = PrefixIndex(db.session.query(model.id, column))
+            _prefix_indexes[model.__tablename__] = index
+    return index
+
+
+def invalidate_search(table_name=None):
+    with _prefix_lock:
+        if table_name is None:
+            _prefix_indexes.clear()
+        else:
+            _prefix_indexes.pop(table_name, None)
+
+
+def prefix_search(model, query, q, terms, page, per_page, filtered):
+    ranked = get_prefix_index(model).search(terms)
+
+    if filtered:
+        # apply the remaining filters of the query to the candidates
+        allowed = set()
+        for start in range(0, len(ranked), 500):
+            allowed.update(row[0] for row in query.with_entities(model.id)
+                           .filter(model.id.in_(ranked[start:start + 500])))
+        ranked = [row_id for row_id in ranked if row_id in allowed]
+
+    page_ids = ranked[(page - 1) * per_page:page * per_page]
+    rows = {item.id: item for item in
+            query.filter(model.id.in_(page_ids))} if page_ids else {}
+    return [rows[row_id] for row_id in page_ids], len(ranked)
+
+
+"""
+Search Functions
+"""
+
+
+def search_query(request, model, query, filtered=False, columns=None):
+    q, terms = get_terms(request)
+    page, per_page = get_page_args(request)
+
+    if db.engine.dialect.name == 'postgresql':
+        engine = postgres_search
+    else:
+        engine = prefix_search
+    columns = columns or row_columns(model)
+    items, total = engine(model, query.with_entities(*columns),
+                          q, terms, page, per_page, filtered)
+
+    return rows_to_dicts(columns, items), {
+        'total': total,
+        'page': page,
+        'per_page': per_page
+    }
@@ -0,0 +1,86 @@
+import json
+from datetime import date
+from flask import Response
+from werkzeug.http import http_date
+from config import serializer as serializer_config
+from instrumentation import phase
+
+"""
+Serializers
+
+List endpoints encode their payload here instead of through jsonify.
+Rows arrive as plain dicts built from column tuples (see
+models.rows_to_dicts), and orjson is used when it is installed. Dates keep
+the RFC 1123 form jsonify produced unless JSON_DATE_FORMAT=iso.
+"""
+
+
+def http_date_default(value):
+    if isinstance(value, date):
+        return http_date(value)
+    raise TypeError('{!r} is not JSON serializable'.format(value))
+
+
+def iso_date_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError('{!r} is not JSON serializable'.format(value))
+
+
+DATE_FORMATS = {
+    'http': http_date_default,
+    'iso': iso_date_default
+}
+
+
+class JSONSerializer:
+    name = 'json'
+
+    def __init__(self, date_format='http'):
+        self.default = DATE_FORMATS[date_format]
+
+    def dumps(self, obj):
+        return json.dumps(obj, default=self.default,
+                          separators=(',', ':')).encode()
+
+
+class OrjsonSerializer:
+    name = 'orjson'
+
+    def __init__(self, date_format='http'):
+        import orjson
+        self.orjson = orjson
+        if date_format == 'iso':
+            # orjson writes dates as ISO 8601 natively
+            self.default, self.option = None, 0
+        else:
+            self.default = DATE_FORMATS[date_format]
+            self.option = orjson.OPT_PASSTHROUGH_DATETIME
+
+    def dumps(self, obj):
+        return self.orjson.dumps(obj, default=self.default,
+                                 option=self.option)
+
+
+SERIALIZERS = {
+    'json': JSONSerializer,
+    'orjson': OrjsonSerializer
+}
+
+
+def build_serializer(config=serializer_config):
+    if config['backend'] != 'auto':
+        return SERIALIZERS[config['backend']](config['date_format'])
+    try:
+        return OrjsonSerializer(config['date_format'])
+    except ImportError:
+        return JSONSerializer(config['date_format'])
+
+
+serializer = build_serializer()
+
+
+def json_response(obj, status=200):
+    with phase('serialize'):
+        body = serializer.dumps(obj)
+    return Response(body, status=status, mimetype='application/json')